@@ -0,0 +1,21 @@
+"""Response classes shared by the API routes."""
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+# NumPy values serialize natively; naive datetimes (all timestamps here are
+# UTC) are rendered with a trailing "Z"
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+class FastORJSONResponse(ORJSONResponse):
+    """
+    ORJSONResponse for ML outputs.
+
+    Encodes reports holding datetimes and NumPy scalars or arrays in a
+    single orjson call, without a jsonable_encoder pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
@@ -1,15 +1,75 @@
 """Device analysis API routes."""
+import hashlib
+import json
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional, List
+from sqlalchemy import select, desc
+from typing import Optional, List, Dict, Any
+from datetime import datetime, timedelta
 
+from api.responses import FastORJSONResponse
 from db.database import get_db
+from models.database import AnalysisRecord
 from services.analysis_service import device_analysis_service
+from services.cache_service import cache_service
+from config.settings import settings
 
 router = APIRouter(prefix="/analysis", tags=["Analysis"])
 
 
-@router.post("/{device_id}")
+async def _get_analysis_report(
+    device_id: str,
+    db: AsyncSession,
+    include_grading: bool,
+    include_pricing: bool,
+    image_urls: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Run device analysis, reusing a recent report for identical inputs."""
+    images_digest = hashlib.sha1(json.dumps(image_urls).encode()).hexdigest()
+    cache_key = f"analysis:{device_id}:{include_grading}:{include_pricing}:{images_digest}"
+    
+    analysis_report = await cache_service.get_json(cache_key)
+    if analysis_report is not None:
+        return analysis_report
+    
+    analysis_report = await device_analysis_service.analyze_device(
+        device_id=device_id,
+        db=db,
+        include_grading=include_grading,
+        include_pricing=include_pricing,
+        image_urls=image_urls
+    )
+    
+    await cache_service.set_json(
+        cache_key, analysis_report, settings.ANALYSIS_CACHE_TTL_SECONDS
+    )
+    return analysis_report
+
+
+@router.post("/batch", response_class=FastORJSONResponse)
+async def analyze_devices(
+    device_ids: List[str],
+    include_grading: bool = True,
+    include_pricing: bool = True,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Analyze a fleet of devices in one request.
+    
+    Uses each device's latest stored grading; unknown device IDs are
+    omitted from the result.
+    """
+    reports = await device_analysis_service.analyze_devices(
+        device_ids=device_ids,
+        db=db,
+        include_grading=include_grading,
+        include_pricing=include_pricing
+    )
+    
+    return FastORJSONResponse(reports)
+
+
+@router.post("/{device_id}", response_class=FastORJSONResponse)
 async def analyze_device(
     device_id: str,
     include_grading: bool = True,
@@ -27,7 +87,7 @@ async def analyze_device(
     - Recommendations
     """
     try:
-        analysis_report = await device_analysis_service.analyze_device(
+        analysis_report = await _get_analysis_report(
             device_id=device_id,
             db=db,
             include_grading=include_grading,
@@ -35,7 +95,8 @@ async def analyze_device(
             image_urls=image_urls
         )
         
-        return analysis_report
+        # Hand the report straight to orjson, skipping jsonable_encoder
+        return FastORJSONResponse(analysis_report)
     
     except ValueError as e:
         raise HTTPException(
@@ -49,25 +110,25 @@ async def analyze_device(
         )
 
 
-@router.get("/{device_id}/health")
+@router.get("/{device_id}/health", response_class=FastORJSONResponse)
 async def get_health_analysis(
     device_id: str,
     db: AsyncSession = Depends(get_db)
 ):
     """Get only hardware health analysis."""
     try:
-        analysis_report = await device_analysis_service.analyze_device(
+        analysis_report = await _get_analysis_report(
             device_id=device_id,
             db=db,
             include_grading=False,
             include_pricing=False
         )
         
-        return {
+        return FastORJSONResponse({
             'device_id': device_id,
             'health_prediction': analysis_report['health_prediction'],
             'device_info': analysis_report['device_info']
-        }
+        })
     
     except ValueError as e:
         raise HTTPException(
@@ -76,25 +137,42 @@ async def get_health_analysis(
         )
 
 
-@router.get("/{device_id}/recommendations")
+@router.get("/{device_id}/recommendations", response_class=FastORJSONResponse)
 async def get_recommendations(
     device_id: str,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get device recommendations."""
+    """Get device recommendations, reusing a recent analysis when available."""
+    max_age = timedelta(seconds=settings.ANALYSIS_RECOMMENDATIONS_MAX_AGE_SECONDS)
+    latest_analysis = await db.scalar(
+        select(AnalysisRecord)
+        .where(AnalysisRecord.device_id == device_id)
+        .where(AnalysisRecord.include_grading.is_(True))
+        .where(AnalysisRecord.include_pricing.is_(True))
+        .order_by(desc(AnalysisRecord.timestamp))
+        .limit(1)
+    )
+    
+    if latest_analysis and datetime.utcnow() - latest_analysis.timestamp < max_age:
+        return FastORJSONResponse({
+            'device_id': device_id,
+            'recommendations': latest_analysis.recommendations,
+            'timestamp': latest_analysis.timestamp
+        })
+    
     try:
-        analysis_report = await device_analysis_service.analyze_device(
+        analysis_report = await _get_analysis_report(
             device_id=device_id,
             db=db,
             include_grading=True,
             include_pricing=True
         )
         
-        return {
+        return FastORJSONResponse({
             'device_id': device_id,
             'recommendations': analysis_report['recommendations'],
             'timestamp': analysis_report['timestamp']
-        }
+        })
     
     except ValueError as e:
         raise HTTPException(
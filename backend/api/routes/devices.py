@@ -1,12 +1,16 @@
 """Device management API routes."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete
 from typing import List
 
+from api.streaming import stream_json_array
 from db.database import get_db
 from models.database import Device
-from models.schemas import DeviceCreate, DeviceResponse
+from models.schemas import DeviceCreate, DeviceResponse, DeviceListAdapter
+from services.cache_service import cache_service, device_cache_key, latest_grading_cache_key
+from services.telemetry_window import telemetry_window_cache
 
 router = APIRouter(prefix="/devices", tags=["Devices"])
 
@@ -70,16 +74,19 @@ async def list_devices(
     db: AsyncSession = Depends(get_db)
 ):
     """List all devices with optional filtering."""
-    query = select(Device)
+    # Select table columns rather than the entity to skip ORM hydration
+    query = select(Device.__table__)
     
     if status_filter:
         query = query.where(Device.status == status_filter)
     
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    devices = result.scalars().all()
+    query = query.offset(skip).limit(limit).execution_options(yield_per=500)
+    devices = await db.stream(query)
     
-    return devices
+    return StreamingResponse(
+        stream_json_array(devices.partitions(), DeviceListAdapter),
+        media_type="application/json"
+    )
 
 
 @router.delete("/{device_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -88,18 +95,19 @@ async def delete_device(
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a device."""
-    result = await db.execute(
-        select(Device).where(Device.id == device_id)
+    deleted_id = await db.scalar(
+        delete(Device).where(Device.id == device_id).returning(Device.id)
     )
-    device = result.scalar_one_or_none()
     
-    if not device:
+    if deleted_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Device {device_id} not found"
         )
     
-    await db.delete(device)
     await db.commit()
     
-    return None
+    await cache_service.delete(device_cache_key(device_id), latest_grading_cache_key(device_id))
+    telemetry_window_cache.discard(device_id)
+    
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
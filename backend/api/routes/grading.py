@@ -1,13 +1,15 @@
 """Device grading API routes."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, exists, update
 from typing import List
 
 from db.database import get_db
 from models.database import GradingRecord, Device
-from models.schemas import GradingRequest, GradingResponse
-from services.ml.grading_engine import grading_engine
+from models.schemas import GradingRequest, GradingResponse, GradingListAdapter
+from services.cache_service import cache_service, device_cache_key, latest_grading_cache_key
+from services.ml import get_grading_engine
 
 router = APIRouter(prefix="/grading", tags=["Grading"])
 
@@ -19,19 +21,18 @@ async def grade_device(
 ):
     """Grade device condition from images."""
     # Verify device exists
-    result = await db.execute(
-        select(Device).where(Device.id == grading_request.device_id)
+    device_exists = await db.scalar(
+        select(exists().where(Device.id == grading_request.device_id))
     )
-    device = result.scalar_one_or_none()
     
-    if not device:
+    if not device_exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Device {grading_request.device_id} not found"
         )
     
     # Run grading engine
-    grading_result = await grading_engine.grade_device(grading_request.image_urls)
+    grading_result = await get_grading_engine().grade_device(grading_request.image_urls)
     
     # Save grading record
     grading_record = GradingRecord(
@@ -48,14 +49,26 @@ async def grade_device(
     )
     
     db.add(grading_record)
-    await db.commit()
-    await db.refresh(grading_record)
     
     # Update device status
-    device.status = "graded"
+    await db.execute(
+        update(Device)
+        .where(Device.id == grading_request.device_id)
+        .values(status="graded")
+    )
     await db.commit()
     
-    return grading_record
+    await cache_service.delete(
+        device_cache_key(grading_request.device_id),
+        latest_grading_cache_key(grading_request.device_id)
+    )
+    
+    # Detection results hold NumPy arrays; orjson encodes them directly,
+    # skipping response model validation
+    return ORJSONResponse(
+        {field: getattr(grading_record, field) for field in GradingResponse.model_fields},
+        status_code=status.HTTP_201_CREATED
+    )
 
 
 @router.get("/{device_id}", response_model=List[GradingResponse])
@@ -64,13 +77,14 @@ async def get_grading_history(
     db: AsyncSession = Depends(get_db)
 ):
     """Get grading history for a device."""
+    # Select table columns rather than the entity to skip ORM hydration
     result = await db.execute(
-        select(GradingRecord)
+        select(GradingRecord.__table__)
         .where(GradingRecord.device_id == device_id)
         .order_by(desc(GradingRecord.timestamp))
     )
     
-    grading_records = result.scalars().all()
+    grading_records = result.mappings().all()
     
     if not grading_records:
         raise HTTPException(
@@ -78,7 +92,13 @@ async def get_grading_history(
             detail=f"No grading records found for device {device_id}"
         )
     
-    return grading_records
+    # Validate and serialize the whole list in one pass
+    return Response(
+        GradingListAdapter.dump_json(
+            GradingListAdapter.validate_python(grading_records, from_attributes=True)
+        ),
+        media_type="application/json"
+    )
 
 
 @router.get("/{device_id}/latest", response_model=GradingResponse)
@@ -87,15 +107,13 @@ async def get_latest_grading(
     db: AsyncSession = Depends(get_db)
 ):
     """Get the most recent grading record."""
-    result = await db.execute(
+    grading_record = await db.scalar(
         select(GradingRecord)
         .where(GradingRecord.device_id == device_id)
         .order_by(desc(GradingRecord.timestamp))
         .limit(1)
     )
     
-    grading_record = result.scalar_one_or_none()
-    
     if not grading_record:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
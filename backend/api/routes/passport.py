@@ -1,18 +1,38 @@
 """Digital Passport API routes."""
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, cast, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from typing import List
 from datetime import datetime
 
 from db.database import get_db
-from models.database import DigitalPassport, Device
-from models.schemas import PassportCreate, PassportResponse, LifecycleEvent
+from models.database import DigitalPassport, Device, BlockchainTransaction
+from models.schemas import PassportCreate, PassportResponse, LifecycleEvent, BlockchainTransactionResponse
 from services.blockchain.solana_service import get_solana_service
+from services.blockchain.tx_queue import blockchain_tx_queue
+from services.cache_service import cache_service, device_cache_key
 from config.settings import settings
 
 router = APIRouter(prefix="/passports", tags=["Digital Passports"])
 
+# Passport counter incremented by each lifecycle event type
+EVENT_COUNTERS = {
+    'repair': 'total_repairs',
+    'refurbishment': 'total_refurbishments',
+    'parts_harvested': 'parts_harvested',
+    'recycling': 'recycling_events',
+}
+
+# Build the Solana client once at import instead of per request
+solana_service = get_solana_service(
+    settings.SOLANA_RPC_URL,
+    settings.SOLANA_PRIVATE_KEY,
+    settings.SOLANA_NETWORK
+)
+
 
 @router.post("/", response_model=PassportResponse, status_code=status.HTTP_201_CREATED)
 async def create_passport(
@@ -20,11 +40,20 @@ async def create_passport(
     db: AsyncSession = Depends(get_db)
 ):
     """Create a Digital Passport NFT for a device."""
-    # Verify device exists
+    # Verify device exists and has no passport yet in a single round-trip,
+    # fetching only the device columns needed for the NFT metadata
     result = await db.execute(
-        select(Device).where(Device.id == passport_data.device_id)
+        select(
+            Device.id,
+            Device.model,
+            Device.manufacturer,
+            Device.purchase_date,
+            DigitalPassport.id.label('existing_passport_id')
+        )
+        .outerjoin(DigitalPassport, DigitalPassport.device_id == Device.id)
+        .where(Device.id == passport_data.device_id)
     )
-    device = result.scalar_one_or_none()
+    device = result.one_or_none()
     
     if not device:
         raise HTTPException(
@@ -32,25 +61,16 @@ async def create_passport(
             detail=f"Device {passport_data.device_id} not found"
         )
     
-    # Check if passport already exists
-    result = await db.execute(
-        select(DigitalPassport).where(DigitalPassport.device_id == passport_data.device_id)
-    )
-    existing_passport = result.scalar_one_or_none()
-    
-    if existing_passport:
+    if device.existing_passport_id:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"Passport already exists for device {passport_data.device_id}"
         )
     
-    # Mint NFT on Solana
-    solana_service = get_solana_service(
-        settings.SOLANA_RPC_URL,
-        settings.SOLANA_PRIVATE_KEY,
-        settings.SOLANA_NETWORK
-    )
+    # Release the pooled connection while waiting on the blockchain RPC
+    await db.commit()
     
+    # Mint NFT on Solana
     metadata = {
         'device_id': device.id,
         'model': device.model,
@@ -84,11 +104,24 @@ async def create_passport(
     db.add(passport)
     
     # Update device with passport info
-    device.passport_id = passport_id
-    device.passport_mint_address = mint_result['mint_address']
+    await db.execute(
+        update(Device)
+        .where(Device.id == device.id)
+        .values(passport_id=passport_id, passport_mint_address=mint_result['mint_address'])
+    )
     
-    await db.commit()
-    await db.refresh(passport)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request stored the passport first. Both minted at the
+        # device's derived mint address, so only one NFT exists
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Passport already exists for device {passport_data.device_id}"
+        )
+    
+    await cache_service.delete(device_cache_key(device.id))
     
     return passport
 
@@ -141,7 +174,9 @@ async def add_lifecycle_event(
 ):
     """Add a lifecycle event to the passport."""
     result = await db.execute(
-        select(DigitalPassport).where(DigitalPassport.id == passport_id)
+        select(DigitalPassport)
+        .options(joinedload(DigitalPassport.device))
+        .where(DigitalPassport.id == passport_id)
     )
     passport = result.scalar_one_or_none()
     
@@ -151,61 +186,84 @@ async def add_lifecycle_event(
             detail=f"Passport {passport_id} not found"
         )
     
-    # Record event on blockchain
-    solana_service = get_solana_service(
-        settings.SOLANA_RPC_URL,
-        settings.SOLANA_PRIVATE_KEY,
-        settings.SOLANA_NETWORK
-    )
-    
-    blockchain_result = await solana_service.record_lifecycle_event(
+    # Queue the on-chain write; it's committed with the event below and
+    # submitted by the background worker, so RPC latency stays off this request
+    event_data = event.model_dump(mode='json')
+    tx_id = blockchain_tx_queue.enqueue_lifecycle_event(
+        db,
+        passport_id=passport.id,
         mint_address=passport.mint_address,
         event_type=event.event_type,
-        event_data=event.model_dump()
+        event_data=event_data
     )
     
-    # Add to lifecycle events
-    lifecycle_events = passport.lifecycle_events or []
-    lifecycle_events.append({
-        **event.model_dump(),
-        'blockchain_tx': blockchain_result['transaction_signature']
-    })
-    passport.lifecycle_events = lifecycle_events
-    
-    # Update counters and scores
-    if event.event_type == 'repair':
-        passport.total_repairs += 1
-    elif event.event_type == 'refurbishment':
-        passport.total_refurbishments += 1
-    elif event.event_type == 'parts_harvested':
-        passport.parts_harvested += 1
-    elif event.event_type == 'recycling':
-        passport.recycling_events += 1
+    new_event = {
+        **event_data,
+        'blockchain_tx': tx_id
+    }
+    
+    # Counter values after this event, for the score recalculation
+    counter = EVENT_COUNTERS.get(event.event_type)
+    counts = {
+        column: getattr(passport, column) + (1 if column == counter else 0)
+        for column in EVENT_COUNTERS.values()
+    }
     
     # Recalculate circularity score
-    device_result = await db.execute(
-        select(Device).where(Device.id == passport.device_id)
-    )
-    device = device_result.scalar_one()
-    usage_years = (datetime.utcnow() - device.purchase_date).days / 365
-    
-    passport.circularity_score = solana_service.calculate_circularity_score(
-        repairs=passport.total_repairs,
-        refurbishments=passport.total_refurbishments,
-        parts_harvested=passport.parts_harvested,
-        recycling_events=passport.recycling_events,
+    usage_years = (datetime.utcnow() - passport.device.purchase_date).days / 365
+    
+    circularity_score = solana_service.calculate_circularity_score(
+        repairs=counts['total_repairs'],
+        refurbishments=counts['total_refurbishments'],
+        parts_harvested=counts['parts_harvested'],
+        recycling_events=counts['recycling_events'],
         usage_years=usage_years
     )
     
     # Recalculate carbon footprint
-    passport.carbon_footprint = solana_service.calculate_carbon_footprint(
+    carbon_footprint = solana_service.calculate_carbon_footprint(
         usage_years=usage_years,
-        repairs=passport.total_repairs,
-        refurbishments=passport.total_refurbishments,
-        parts_harvested=passport.parts_harvested
+        repairs=counts['total_repairs'],
+        refurbishments=counts['total_refurbishments'],
+        parts_harvested=counts['parts_harvested']
+    )
+    
+    # Append the event and bump its counter server-side in a single UPDATE,
+    # so only the new event is sent regardless of history length
+    values = {
+        'lifecycle_events': func.coalesce(DigitalPassport.lifecycle_events, cast([], JSONB))
+            .op('||')(cast([new_event], JSONB)),
+        'circularity_score': circularity_score,
+        'carbon_footprint': carbon_footprint,
+    }
+    if counter:
+        values[counter] = getattr(DigitalPassport, counter) + 1
+    
+    passport = await db.scalar(
+        update(DigitalPassport)
+        .where(DigitalPassport.id == passport_id)
+        .values(**values)
+        .returning(DigitalPassport)
+        .execution_options(populate_existing=True)
     )
     
     await db.commit()
-    await db.refresh(passport)
     
     return passport
+
+
+@router.get("/transactions/{tx_id}", response_model=BlockchainTransactionResponse)
+async def get_transaction_status(
+    tx_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the on-chain status of a queued passport operation."""
+    transaction = await db.get(BlockchainTransaction, tx_id)
+    
+    if not transaction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Transaction {tx_id} not found"
+        )
+    
+    return transaction
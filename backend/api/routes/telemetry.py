@@ -1,14 +1,20 @@
 """Telemetry data API routes."""
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, insert, exists, literal
 from typing import List
 from datetime import datetime, timedelta
+import numpy as np
 
+from api.streaming import stream_json_array
 from db.database import get_db
+from db.telemetry_history import device_recent_history
 from models.database import TelemetrySnapshot, Device
-from models.schemas import TelemetryCreate, TelemetryResponse
-from services.ml.health_predictor import health_predictor
+from models.schemas import TelemetryCreate, TelemetryResponse, TelemetryListAdapter
+from services.ml import get_health_predictor
+from services.ml.telemetry_columns import records_from_rows
+from services.telemetry_window import telemetry_window_cache
 
 router = APIRouter(prefix="/telemetry", tags=["Telemetry"])
 
@@ -19,63 +25,71 @@ async def ingest_telemetry(
     db: AsyncSession = Depends(get_db)
 ):
     """Ingest telemetry data from Guardian app."""
-    # Verify device exists
-    result = await db.execute(
-        select(Device).where(Device.id == telemetry_data.device_id)
-    )
-    device = result.scalar_one_or_none()
+    device_id = telemetry_data.device_id
     
-    if not device:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Device {telemetry_data.device_id} not found"
+    # Get recent telemetry for prediction, from the window cache when warm.
+    # The window is a record array built once here and passed on as is.
+    # A warm window means this device was ingested within the TTL; a cold
+    # load checks the device in the same query, so unknown devices are
+    # rejected before inference.
+    cached_history = telemetry_window_cache.get(device_id)
+    if cached_history is None:
+        recent_result = await db.execute(
+            device_recent_history(device_id, telemetry_window_cache.window_size)
         )
-    
-    # Get recent telemetry for prediction
-    recent_result = await db.execute(
-        select(TelemetrySnapshot)
-        .where(TelemetrySnapshot.device_id == telemetry_data.device_id)
-        .order_by(desc(TelemetrySnapshot.timestamp))
-        .limit(30)
-    )
-    recent_telemetry = recent_result.scalars().all()
-    
-    # Prepare history for ML prediction
-    telemetry_history = [
-        {
-            'timestamp': t.timestamp,
-            'battery_cycle_count': t.battery_cycle_count,
-            'battery_health_percentage': t.battery_health_percentage,
-            'battery_temperature': t.battery_temperature,
-            'thermal_events_count': t.thermal_events_count,
-            'crash_count': t.crash_count,
-        }
-        for t in recent_telemetry
-    ]
+        rows = recent_result.all()
+        if not rows:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Device {device_id} not found"
+            )
+        recent_history = records_from_rows([row for row in rows if row.timestamp is not None])
+    else:
+        recent_history = cached_history
     
     # Add current data
-    telemetry_history.append({
-        'timestamp': datetime.utcnow(),
-        'battery_cycle_count': telemetry_data.battery_cycle_count,
-        'battery_health_percentage': telemetry_data.battery_health_percentage,
-        'battery_temperature': telemetry_data.battery_temperature,
-        'thermal_events_count': telemetry_data.thermal_events_count,
-        'crash_count': telemetry_data.crash_count,
-    })
+    timestamp = datetime.utcnow()
+    current_point = records_from_rows([(
+        timestamp,
+        telemetry_data.battery_cycle_count,
+        telemetry_data.battery_health_percentage,
+        telemetry_data.battery_temperature,
+        telemetry_data.thermal_events_count,
+        telemetry_data.crash_count,
+    )])
+    telemetry_history = np.concatenate((recent_history, current_point))
     
     # Run ML prediction
-    prediction = await health_predictor.predict_rul(telemetry_history)
+    prediction = await get_health_predictor().predict_rul(telemetry_history)
     
-    # Create telemetry snapshot
-    snapshot = TelemetrySnapshot(
+    # Insert the snapshot only if the device still exists, in the same statement
+    values = {
         **telemetry_data.model_dump(),
-        predicted_rul_days=prediction['predicted_rul_days'],
-        failure_probability=prediction['failure_probability']
+        'timestamp': timestamp,
+        'predicted_rul_days': prediction['predicted_rul_days'],
+        'failure_probability': prediction['failure_probability'],
+    }
+    table = TelemetrySnapshot.__table__
+    row = select(*[literal(v, type_=table.c[k].type) for k, v in values.items()])
+    result = await db.execute(
+        insert(TelemetrySnapshot)
+        .from_select(list(values), row.where(exists().where(Device.id == device_id)))
+        .returning(*table.c)
     )
+    snapshot = result.mappings().one_or_none()
+    
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Device {device_id} not found"
+        )
     
-    db.add(snapshot)
     await db.commit()
-    await db.refresh(snapshot)
+    
+    if cached_history is None:
+        telemetry_window_cache.load(device_id, telemetry_history)
+    else:
+        telemetry_window_cache.append(device_id, current_point)
     
     return snapshot
 
@@ -89,22 +103,28 @@ async def get_telemetry_history(
     """Get telemetry history for a device."""
     cutoff_date = datetime.utcnow() - timedelta(days=days)
     
-    result = await db.execute(
-        select(TelemetrySnapshot)
+    # Select table columns rather than the entity to skip ORM hydration
+    snapshots = await db.stream(
+        select(TelemetrySnapshot.__table__)
         .where(TelemetrySnapshot.device_id == device_id)
         .where(TelemetrySnapshot.timestamp >= cutoff_date)
         .order_by(TelemetrySnapshot.timestamp)
+        .execution_options(yield_per=500)
     )
     
-    snapshots = result.scalars().all()
+    partitions = snapshots.partitions()
+    first_partition = await anext(partitions, None)
     
-    if not snapshots:
+    if first_partition is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No telemetry data found for device {device_id}"
         )
     
-    return snapshots
+    return StreamingResponse(
+        stream_json_array(partitions, TelemetryListAdapter, first=first_partition),
+        media_type="application/json"
+    )
 
 
 @router.get("/{device_id}/latest", response_model=TelemetryResponse)
@@ -113,15 +133,13 @@ async def get_latest_telemetry(
     db: AsyncSession = Depends(get_db)
 ):
     """Get the most recent telemetry snapshot."""
-    result = await db.execute(
+    snapshot = await db.scalar(
         select(TelemetrySnapshot)
         .where(TelemetrySnapshot.device_id == device_id)
         .order_by(desc(TelemetrySnapshot.timestamp))
         .limit(1)
     )
     
-    snapshot = result.scalar_one_or_none()
-    
     if not snapshot:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
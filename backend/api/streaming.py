@@ -0,0 +1,39 @@
+"""Helpers for streaming large result sets as JSON."""
+from typing import Any, AsyncIterator, Optional, Sequence
+from pydantic import TypeAdapter
+
+
+async def stream_json_array(
+    partitions: AsyncIterator[Sequence[Any]],
+    adapter: TypeAdapter,
+    first: Optional[Sequence[Any]] = None
+) -> AsyncIterator[bytes]:
+    """
+    Serialize batches of rows into a single JSON array.
+    
+    Each batch (e.g. one yield_per partition) is validated and dumped in a
+    single pydantic-core call, so memory stays bounded by the fetch batch
+    while producing the same payload as a regular list response.
+    
+    Args:
+        partitions: Async iterator of row batches (ORM objects, rows or mappings)
+        adapter: TypeAdapter for a list of the response schema
+        first: Batch already pulled from the iterator (e.g. for an empty check)
+    """
+    separator = b"["
+    
+    async def batches():
+        if first is not None:
+            yield first
+        async for rows in partitions:
+            yield rows
+    
+    async for rows in batches():
+        if not rows:
+            continue
+        # Splice the batch's "[...]" into the outer array
+        chunk = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+        yield separator + chunk[1:-1]
+        separator = b","
+    
+    yield b"[]" if separator == b"[" else b"]"
@@ -1,45 +1,129 @@
 """Database connection and session management."""
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import orjson
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, raiseload
 from config.settings import settings
+from db.fleet_stats import create_fleet_stats_views
 from models.database import Base
 
 
+def _json_serializer(value) -> str:
+    """Serialize JSON/JSONB bind values (NumPy arrays included) with orjson."""
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
 # Create async engine
+# SQL echo stays off; enable the "sqlalchemy.engine" logger to trace queries
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=settings.DEBUG,
+    echo=False,
     pool_size=settings.DATABASE_POOL_SIZE,
     max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+    pool_recycle=settings.DATABASE_POOL_RECYCLE,
+    pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    connect_args={
+        # Short OLTP queries never pay off JIT compilation
+        "server_settings": {"jit": "off"},
+        # Reuse parsed/planned statements across calls. Behind PgBouncer
+        # this needs transaction pooling with max_prepared_statements set
+        # (PgBouncer >= 1.21); older poolers need both sizes set to 0.
+        "statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DATABASE_PREPARED_STATEMENT_CACHE_SIZE,
+    },
 )
 
 # Create async session factory
-AsyncSessionLocal = sessionmaker(
+AsyncSessionLocal = async_sessionmaker(
     engine,
-    class_=AsyncSession,
     expire_on_commit=False,
-    autocommit=False,
     autoflush=False,
 )
 
 
+if settings.DEBUG:
+    @event.listens_for(Session, "do_orm_execute")
+    def _raise_on_lazy_load(execute_state):
+        """
+        Make any relationship not loaded explicitly raise on access in
+        development, so hidden N+1 lazy loads surface immediately.
+        """
+        if (
+            execute_state.is_select
+            and execute_state.is_orm_statement
+            and not execute_state.is_relationship_load
+            and not execute_state.is_column_load
+        ):
+            execute_state.statement = execute_state.statement.options(raiseload("*"))
+
+
 async def get_db():
-    """Dependency for getting database session."""
+    """
+    Dependency for getting database session.
+    
+    Handlers that write are responsible for committing; read-only requests
+    skip the extra COMMIT round-trip.
+    """
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()
         except Exception:
             await session.rollback()
             raise
-        finally:
-            await session.close()
+
+
+async def _init_timescaledb(conn):
+    """
+    Turn telemetry_snapshots into a TimescaleDB hypertable.
+    
+    Weekly chunks let time-window queries prune whole partitions; chunks
+    older than 30 days are compressed (segmented by device) and data older
+    than a year is dropped. Safe to run on every startup.
+    """
+    await conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb"))
+    
+    created = await conn.scalar(text(
+        "SELECT (create_hypertable("
+        "'telemetry_snapshots', 'timestamp', "
+        "chunk_time_interval => INTERVAL '7 days', "
+        "create_default_indexes => FALSE, "
+        "if_not_exists => TRUE, migrate_data => TRUE)).created"
+    ))
+    if created:
+        await conn.execute(text(
+            "ALTER TABLE telemetry_snapshots SET ("
+            "timescaledb.compress, timescaledb.compress_segmentby = 'device_id')"
+        ))
+    
+    await conn.execute(text(
+        "SELECT add_compression_policy('telemetry_snapshots', "
+        "INTERVAL '30 days', if_not_exists => TRUE)"
+    ))
+    await conn.execute(text(
+        "SELECT add_retention_policy('telemetry_snapshots', "
+        "INTERVAL '365 days', if_not_exists => TRUE)"
+    ))
 
 
 async def init_db():
-    """Initialize database tables."""
+    """Initialize database tables and pre-warm the connection pool."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        if settings.TIMESCALEDB_ENABLED:
+            await _init_timescaledb(conn)
+        await create_fleet_stats_views(conn)
+    
+    # Open the pool's connections up front so the first burst of requests
+    # doesn't serialize on connection handshakes
+    connections = await asyncio.gather(
+        *(engine.connect() for _ in range(settings.DATABASE_POOL_SIZE))
+    )
+    for conn in connections:
+        await conn.close()
 
 
 async def close_db():
@@ -0,0 +1,123 @@
+"""Precomputed fleet-wide statistics backed by materialized views."""
+import asyncio
+import logging
+from typing import Any, Dict
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Grading outcomes per model and grade
+FLEET_STATS_VIEW = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_device_fleet_stats AS
+SELECT d.manufacturer,
+       d.model,
+       g.grade,
+       count(*) AS grading_count,
+       avg(g.confidence_score) AS avg_confidence
+FROM grading_records g
+JOIN devices d ON d.id = g.device_id
+GROUP BY d.manufacturer, d.model, g.grade
+"""
+
+# Single-row totals that would otherwise need full scans per request
+FLEET_TOTALS_VIEW = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_fleet_totals AS
+SELECT 1 AS id,
+       (SELECT count(*) FROM devices WHERE status = 'active') AS active_devices,
+       coalesce(sum(total_repairs), 0) AS repairs,
+       coalesce(sum(total_refurbishments), 0) AS refurbishments,
+       coalesce(sum(parts_harvested), 0) AS parts_harvested,
+       coalesce(sum(recycling_events), 0) AS recycling_events,
+       coalesce(sum(total_repairs * 5.0 + total_refurbishments * 30.0
+                    + parts_harvested * 15.0), 0) AS carbon_saved_kg
+FROM digital_passports
+"""
+
+# REFRESH ... CONCURRENTLY requires a unique index covering every row
+VIEW_INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_mv_device_fleet_stats "
+    "ON mv_device_fleet_stats (manufacturer, model, grade)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_mv_fleet_totals ON mv_fleet_totals (id)",
+]
+
+# Planner row estimates instead of linear COUNT(*) scans
+APPROXIMATE_COUNT = "SELECT greatest(reltuples::bigint, 0) FROM pg_class WHERE relname = :table"
+
+
+async def create_fleet_stats_views(conn: AsyncConnection):
+    """Create the fleet statistics views if they don't exist yet."""
+    await conn.execute(text(FLEET_STATS_VIEW))
+    await conn.execute(text(FLEET_TOTALS_VIEW))
+    for statement in VIEW_INDEXES:
+        await conn.execute(text(statement))
+
+
+async def refresh_fleet_stats(engine: AsyncEngine):
+    """Refresh the views without blocking readers."""
+    async with engine.begin() as conn:
+        await conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_device_fleet_stats"))
+        await conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_fleet_totals"))
+
+
+async def refresh_fleet_stats_periodically(engine: AsyncEngine):
+    """Background task refreshing the views every FLEET_STATS_REFRESH_SECONDS."""
+    while True:
+        await asyncio.sleep(settings.FLEET_STATS_REFRESH_SECONDS)
+        try:
+            await refresh_fleet_stats(engine)
+        except Exception as e:
+            logger.error(f"Fleet stats refresh failed: {e}")
+
+
+async def _approximate_count(db: AsyncSession, table: str) -> int:
+    """Approximate row count for a table."""
+    if table == "telemetry_snapshots" and settings.TIMESCALEDB_ENABLED:
+        # A hypertable's parent relation holds no rows; ask TimescaleDB
+        return await db.scalar(
+            text("SELECT approximate_row_count(CAST(:table AS regclass))"), {"table": table}
+        ) or 0
+
+    return await db.scalar(text(APPROXIMATE_COUNT), {"table": table}) or 0
+
+
+async def get_fleet_stats(db: AsyncSession) -> Dict[str, Any]:
+    """
+    Read fleet statistics from the precomputed views.
+
+    Totals are planner estimates and the rollups are at most
+    FLEET_STATS_REFRESH_SECONDS old.
+    """
+    totals = (await db.execute(text("SELECT * FROM mv_fleet_totals"))).mappings().one()
+    grades = (await db.execute(text(
+        "SELECT manufacturer, model, grade, grading_count, avg_confidence "
+        "FROM mv_device_fleet_stats ORDER BY manufacturer, model, grade"
+    ))).mappings().all()
+
+    return {
+        "total_devices": await _approximate_count(db, "devices"),
+        "active_devices": totals["active_devices"],
+        "total_grading_records": await _approximate_count(db, "grading_records"),
+        "total_telemetry_snapshots": await _approximate_count(db, "telemetry_snapshots"),
+        "digital_passports_minted": await _approximate_count(db, "digital_passports"),
+        "circular_actions": {
+            "repairs": totals["repairs"],
+            "refurbishments": totals["refurbishments"],
+            "parts_harvested": totals["parts_harvested"],
+            "recycling_events": totals["recycling_events"]
+        },
+        "carbon_saved_kg": round(float(totals["carbon_saved_kg"]), 1),
+        "grades": [
+            {
+                "manufacturer": row["manufacturer"],
+                "model": row["model"],
+                "grade": row["grade"],
+                "grading_count": row["grading_count"],
+                "avg_confidence": round(row["avg_confidence"], 3) if row["avg_confidence"] is not None else None
+            }
+            for row in grades
+        ]
+    }
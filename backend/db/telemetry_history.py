@@ -0,0 +1,41 @@
+"""Telemetry history queries shaped for the ML engines."""
+from sqlalchemy import desc, func, select, true
+from sqlalchemy.sql import Select
+
+from models.database import Device, TelemetrySnapshot
+from services.ml.telemetry_columns import TELEMETRY_FIELDS
+
+# Telemetry selected straight into columns (TELEMETRY_FIELDS order), with
+# missing readings filled in server-side
+TELEMETRY_HISTORY_COLUMNS = [
+    getattr(TelemetrySnapshot, field) if fill is None
+    else func.coalesce(getattr(TelemetrySnapshot, field), fill).label(field)
+    for field, (_, fill) in TELEMETRY_FIELDS.items()
+]
+
+
+def device_recent_history(device_id: str, limit: int) -> Select:
+    """
+    A device's last `limit` snapshots, oldest first, in one statement.
+
+    The device row is outer-joined to a LATERAL window of its snapshots, so
+    the result also tells whether the device exists:
+
+    - no rows: unknown device
+    - one row with a NULL timestamp: known device without telemetry
+    - otherwise one row per snapshot, in TELEMETRY_FIELDS order
+    """
+    window = (
+        select(*TELEMETRY_HISTORY_COLUMNS)
+        .where(TelemetrySnapshot.device_id == Device.id)
+        .order_by(desc(TelemetrySnapshot.timestamp))
+        .limit(limit)
+        .lateral()
+    )
+    return (
+        select(*window.c)
+        .select_from(Device)
+        .outerjoin(window, true())
+        .where(Device.id == device_id)
+        .order_by(window.c.timestamp)
+    )
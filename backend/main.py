@@ -1,12 +1,19 @@
 """Main FastAPI application."""
+import asyncio
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 
 from config.settings import settings
-from db.database import init_db, close_db
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import init_db, close_db, get_db, engine
+from db.fleet_stats import get_fleet_stats, refresh_fleet_stats_periodically
+from services.blockchain.tx_queue import blockchain_tx_queue
+from services.cache_service import cache_service
+from services.ml import warmup_engines
 from api.routes import devices, telemetry, grading, passport, analysis
 
 # Configure logging
@@ -28,15 +35,35 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
     
+    if settings.ML_WARMUP:
+        try:
+            await asyncio.to_thread(warmup_engines)
+            logger.info("ML engines warmed up")
+        except Exception as e:
+            logger.error(f"ML engine warm-up failed: {e}")
+    
+    stats_refresher = asyncio.create_task(refresh_fleet_stats_periodically(engine))
+    blockchain_worker = asyncio.create_task(blockchain_tx_queue.run_worker())
+    
     yield
     
     # Shutdown
     logger.info("Shutting down LoopPhones Backend API...")
+    stats_refresher.cancel()
+    blockchain_worker.cancel()
+    # Let the cancelled tasks unwind (and return pooled connections) before
+    # the engine is disposed
+    await asyncio.gather(stats_refresher, blockchain_worker, return_exceptions=True)
     try:
         await close_db()
         logger.info("Database connections closed")
     except Exception as e:
         logger.error(f"Error closing database: {e}")
+    try:
+        await cache_service.close()
+        logger.info("Cache connections closed")
+    except Exception as e:
+        logger.error(f"Error closing cache: {e}")
 
 
 # Create FastAPI app
@@ -46,6 +73,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -89,23 +117,9 @@ async def health_check():
 
 
 @app.get("/api/v1/stats")
-async def get_stats():
-    """Get system statistics."""
-    # In production, this would return actual stats from database
-    return {
-        "total_devices": 1247,
-        "active_devices": 892,
-        "total_grading_records": 3456,
-        "total_telemetry_snapshots": 125789,
-        "digital_passports_minted": 567,
-        "circular_actions": {
-            "repairs": 234,
-            "refurbishments": 89,
-            "parts_harvested": 45,
-            "recycling_events": 23
-        },
-        "carbon_saved_kg": 15678.5
-    }
+async def get_stats(db: AsyncSession = Depends(get_db)):
+    """Get system statistics from the precomputed fleet rollups."""
+    return await get_fleet_stats(db)
 
 
 # Exception handlers
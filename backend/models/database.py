@@ -1,7 +1,9 @@
 """Database models using SQLAlchemy ORM."""
-from sqlalchemy import Column, String, Integer, Float, TIMESTAMP, JSON, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, Float, TIMESTAMP, ForeignKey, Text, Index, Boolean
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship, aliased
+from sqlalchemy.sql import func, text, select, and_
 from datetime import datetime
 
 Base = declarative_base()
@@ -24,6 +26,14 @@ class Device(Base):
     passport_mint_address = Column(String)
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    
+    # Read-side relationships; load them explicitly with loader options
+    telemetry = relationship(
+        "TelemetrySnapshot",
+        order_by="TelemetrySnapshot.timestamp",
+        lazy="raise",
+        viewonly=True
+    )
 
 
 class TelemetrySnapshot(Base):
@@ -32,7 +42,9 @@ class TelemetrySnapshot(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     device_id = Column(String, ForeignKey("devices.id"), nullable=False)
-    timestamp = Column(TIMESTAMP, default=datetime.utcnow)
+    # Part of the primary key so the table can be partitioned by time
+    # (TimescaleDB requires the partition column in every unique index)
+    timestamp = Column(TIMESTAMP, primary_key=True, default=datetime.utcnow)
     battery_cycle_count = Column(Integer)
     battery_health_percentage = Column(Float)
     battery_voltage = Column(Float)
@@ -42,6 +54,11 @@ class TelemetrySnapshot(Base):
     crash_count = Column(Integer)
     predicted_rul_days = Column(Integer)  # ML prediction
     failure_probability = Column(Float)
+    
+    # Serves per-device "latest N" and time-window lookups without a sort
+    __table_args__ = (
+        Index("ix_telemetry_device_ts", device_id, timestamp.desc()),
+    )
 
 
 class GradingRecord(Base):
@@ -57,9 +74,46 @@ class GradingRecord(Base):
     screen_cracks_count = Column(Integer)
     body_scratches_count = Column(Integer)
     body_dents_count = Column(Integer)
-    image_urls = Column(JSON)
+    image_urls = Column(JSONB)
     cv_model_version = Column(String)
-    detection_results = Column(JSON)  # Raw YOLO output
+    detection_results = Column(JSONB)  # Raw YOLO output
+    
+    # Raise on implicit access; list queries must load it explicitly
+    device = relationship("Device", lazy="raise")
+    
+    __table_args__ = (
+        Index("ix_grading_device_ts", device_id, timestamp.desc()),
+        # Containment (@>) lookups on detections, e.g. records with cracks
+        Index(
+            "ix_grading_detection_gin",
+            detection_results,
+            postgresql_using="gin",
+            postgresql_ops={"detection_results": "jsonb_path_ops"}
+        ),
+    )
+
+
+# Most recent grading per device, exposed as Device.latest_grading
+_ranked_gradings = select(
+    GradingRecord,
+    func.row_number().over(
+        partition_by=GradingRecord.device_id,
+        order_by=GradingRecord.timestamp.desc()
+    ).label("rank")
+).subquery()
+
+_LatestGrading = aliased(GradingRecord, _ranked_gradings)
+
+Device.latest_grading = relationship(
+    _LatestGrading,
+    primaryjoin=and_(
+        _LatestGrading.device_id == Device.id,
+        _ranked_gradings.c.rank == 1
+    ),
+    uselist=False,
+    lazy="raise",
+    viewonly=True
+)
 
 
 class PriceEstimate(Base):
@@ -74,7 +128,26 @@ class PriceEstimate(Base):
     confidence_interval_lower = Column(Float)
     confidence_interval_upper = Column(Float)
     model_version = Column(String)
-    feature_importance = Column(JSON)
+    feature_importance = Column(JSONB)
+
+
+class AnalysisRecord(Base):
+    """Analysis record model storing the output of a full device analysis."""
+    __tablename__ = "analysis_records"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    device_id = Column(String, ForeignKey("devices.id"), nullable=False)
+    timestamp = Column(TIMESTAMP, default=datetime.utcnow)
+    include_grading = Column(Boolean, nullable=False)
+    include_pricing = Column(Boolean, nullable=False)
+    health_prediction = Column(JSONB)
+    grading = Column(JSONB)
+    price_estimate = Column(JSONB)
+    recommendations = Column(JSONB)
+    
+    __table_args__ = (
+        Index("ix_analysis_device_ts", device_id, timestamp.desc()),
+    )
 
 
 class DigitalPassport(Base):
@@ -90,7 +163,58 @@ class DigitalPassport(Base):
     total_refurbishments = Column(Integer, default=0)
     parts_harvested = Column(Integer, default=0)
     recycling_events = Column(Integer, default=0)
-    lifecycle_events = Column(JSON)  # Array of events
+    lifecycle_events = Column(JSONB, server_default=text("'[]'"))  # Array of events
     carbon_footprint = Column(Float)  # kg CO2e
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    
+    device = relationship("Device", lazy="raise")
+    
+    __table_args__ = (
+        # Containment (@>) lookups, e.g. passports with a repair event
+        Index(
+            "ix_passport_events_gin",
+            lifecycle_events,
+            postgresql_using="gin",
+            postgresql_ops={"lifecycle_events": "jsonb_path_ops"}
+        ),
+        # Filtering passports by the type of their most recent event
+        Index(
+            "ix_passport_latest_event",
+            text("(lifecycle_events -> -1 ->> 'event_type')")
+        ),
+    )
+    
+    # Fetch server-generated timestamps in the INSERT/UPDATE itself (RETURNING)
+    # so handlers don't need a follow-up refresh
+    __mapper_args__ = {"eager_defaults": True}
+
+
+class BlockchainTransaction(Base):
+    """Queued on-chain operation and its confirmation status."""
+    __tablename__ = "blockchain_transactions"
+    
+    id = Column(String, primary_key=True)
+    passport_id = Column(String, ForeignKey("digital_passports.id"), nullable=False)
+    operation = Column(String, nullable=False)  # record_lifecycle_event
+    mint_address = Column(String)
+    payload = Column(JSONB)
+    status = Column(String, nullable=False, default="pending")  # pending, in_flight, confirmed, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    lease_expires_at = Column(TIMESTAMP)  # When an in_flight claim may be taken over
+    next_attempt_at = Column(TIMESTAMP)  # Retry backoff: pending rows are not claimed before this
+    transaction_signature = Column(String)
+    explorer_url = Column(String)
+    error = Column(Text)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        # Workers only ever scan the pending backlog and in-flight claims,
+        # oldest first
+        Index(
+            "ix_blockchain_tx_pending",
+            created_at,
+            postgresql_where=status.in_(("pending", "in_flight"))
+        ),
+    )
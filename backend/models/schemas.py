@@ -1,6 +1,7 @@
 """Pydantic schemas for request/response validation."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import Optional, List, Dict, Any
+from typing_extensions import TypedDict, NotRequired
 from datetime import datetime
 from enum import Enum
 
@@ -92,7 +93,7 @@ class DamageDetection(BaseModel):
     type: str
     count: int
     confidence: float
-    bounding_boxes: List[Dict[str, float]]
+    bounding_boxes: Dict[str, List[float]]  # Columns: x, y, width, height, confidence
 
 
 class GradingResponse(BaseModel):
@@ -154,6 +155,21 @@ class LifecycleEvent(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
+class StoredLifecycleEvent(TypedDict):
+    """
+    Lifecycle event as stored in the passport's JSONB array.
+    
+    Events are validated as LifecycleEvent on the way in; on the way out this
+    is checked by pydantic-core as plain dicts, without building a model
+    instance per event.
+    """
+    event_type: str
+    timestamp: datetime
+    description: str
+    metadata: NotRequired[Optional[Dict[str, Any]]]
+    blockchain_tx: NotRequired[str]  # Queued transaction ID, see /passports/transactions
+
+
 class PassportResponse(BaseModel):
     id: str
     device_id: str
@@ -164,7 +180,7 @@ class PassportResponse(BaseModel):
     total_refurbishments: int
     parts_harvested: int
     recycling_events: int
-    lifecycle_events: List[LifecycleEvent]
+    lifecycle_events: List[StoredLifecycleEvent]
     carbon_footprint: float
     created_at: datetime
     updated_at: datetime
@@ -173,6 +189,22 @@ class PassportResponse(BaseModel):
         from_attributes = True
 
 
+class BlockchainTransactionResponse(BaseModel):
+    id: str
+    passport_id: str
+    operation: str
+    status: str
+    attempts: int
+    transaction_signature: Optional[str]
+    explorer_url: Optional[str]
+    error: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # Analysis Schemas
 class HealthPrediction(BaseModel):
     predicted_rul_days: int
@@ -198,3 +230,9 @@ class Recommendation(BaseModel):
     priority: str  # high, medium, low
     estimated_value: Optional[float]
     reasoning: str
+
+
+# List adapters: validate/serialize a whole batch of rows in one pydantic-core call
+DeviceListAdapter = TypeAdapter(List[DeviceResponse])
+TelemetryListAdapter = TypeAdapter(List[TelemetryResponse])
+GradingListAdapter = TypeAdapter(List[GradingResponse])
@@ -1,17 +1,45 @@
 """Device analysis orchestration service."""
 import logging
-from typing import Dict, Any, List, Optional
+from itertools import groupby
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, TIMESTAMP
+from sqlalchemy.orm import selectinload
 
-from models.database import Device, TelemetrySnapshot, GradingRecord, PriceEstimate
-from services.ml.health_predictor import health_predictor
-from services.ml.grading_engine import grading_engine
-from services.ml.pricing_engine import pricing_engine
+from config.settings import settings
+from db.bulk_writer import BulkWriter
+from db.telemetry_history import TELEMETRY_HISTORY_COLUMNS
+from models.database import Device, TelemetrySnapshot, GradingRecord, PriceEstimate, AnalysisRecord
+from services.cache_service import cache_service, device_cache_key, latest_grading_cache_key
+from services.ml import get_health_predictor, get_grading_engine, get_pricing_engine
+from services.ml.telemetry_columns import (
+    TelemetryColumns,
+    columns_from_rows,
+    concat_columns,
+    history_length,
+)
 
 logger = logging.getLogger(__name__)
 
+# Grade score mapping for the pricing engine (1=Poor, 4=Excellent)
+GRADE_SCORES = {'excellent': 4, 'good': 3, 'fair': 2, 'poor': 1}
+
+# Damage counts in grading results, and their weights towards the
+# (screen, body) damage scores
+DAMAGE_COUNT_FIELDS = (
+    'screen_scratches_count',
+    'screen_cracks_count',
+    'body_scratches_count',
+    'body_dents_count',
+)
+DAMAGE_WEIGHTS = np.array([
+    [2, 0],
+    [5, 0],
+    [0, 1],
+    [0, 3],
+])
 
 class DeviceAnalysisService:
     """
@@ -47,32 +75,46 @@ class DeviceAnalysisService:
         """
         logger.info(f"Starting analysis for device {device_id}")
         
-        # 1. Get device info
-        device = await self._get_device(device_id, db)
-        if not device:
-            raise ValueError(f"Device {device_id} not found")
+        # Records produced below are buffered and written together at the end
+        writer = BulkWriter()
+        
+        # 1-2. Get device info, telemetry history (last 30 days) and latest
+        # grading; the device row and latest grading come from cache when present
+        load_grading = include_grading and not image_urls
+        device, latest_grading = await self._get_cached_device(device_id)
+        
+        if device is not None:
+            if load_grading and latest_grading is None:
+                latest_grading = await self._get_latest_grading(device_id, db)
+        else:
+            device = await self._get_device(device_id, db, load_grading=load_grading)
+            if not device:
+                raise ValueError(f"Device {device_id} not found")
+            
+            if load_grading and device.latest_grading:
+                latest_grading = self._grading_to_dict(device.latest_grading)
+            await self._cache_device(device, latest_grading)
         
-        # 2. Get telemetry history (last 30 days)
         telemetry_history = await self._get_telemetry_history(device_id, db, days=30)
         
         # 3. Run health prediction
-        health_prediction = await health_predictor.predict_rul(telemetry_history)
+        health_prediction = await get_health_predictor().predict_rul(telemetry_history)
         
         # 4. Run grading (if requested and images provided)
         grading_result = None
         if include_grading and image_urls:
-            grading_result = await grading_engine.grade_device(image_urls)
+            grading_result = await get_grading_engine().grade_device(image_urls)
             # Save to database
-            await self._save_grading_record(device_id, grading_result, db)
+            await self._save_grading_record(device_id, grading_result, writer, db)
         elif include_grading:
-            # Get most recent grading
-            grading_result = await self._get_latest_grading(device_id, db)
+            # Use most recent grading
+            grading_result = latest_grading
         
         # 5. Run pricing (if requested)
         price_estimate = None
         if include_pricing:
             price_estimate = await self._estimate_price(
-                device, telemetry_history, grading_result, db
+                device, telemetry_history, grading_result, writer, db
             )
         
         # 6. Generate recommendations
@@ -81,73 +123,228 @@ class DeviceAnalysisService:
         )
         
         # 7. Compile comprehensive report
-        analysis_report = {
-            'device_id': device_id,
-            'timestamp': datetime.utcnow().isoformat(),
-            'device_info': {
-                'model': device.model,
-                'manufacturer': device.manufacturer,
-                'age_days': (datetime.utcnow() - device.purchase_date).days,
-                'status': device.status,
-            },
-            'health_prediction': health_prediction,
-            'grading': grading_result,
-            'price_estimate': price_estimate,
-            'recommendations': recommendations,
-        }
+        analysis_report = self._compile_report(
+            device, health_prediction, grading_result, price_estimate, recommendations
+        )
+        
+        # 8. Persist so later lookups can reuse it without rerunning the engines
+        await self._save_analysis_record(
+            device_id, analysis_report, include_grading, include_pricing, writer, db
+        )
+        await writer.flush(db)
+        await db.commit()
+        
+        if include_grading and image_urls:
+            await cache_service.delete(latest_grading_cache_key(device_id))
         
         logger.info(f"Analysis complete for device {device_id}")
         return analysis_report
     
-    async def _get_device(self, device_id: str, db: AsyncSession) -> Optional[Device]:
-        """Retrieve device from database."""
+    async def analyze_devices(
+        self,
+        device_ids: List[str],
+        db: AsyncSession,
+        include_grading: bool = True,
+        include_pricing: bool = True
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze many devices with a fixed number of queries.
+        
+        Devices, telemetry and latest gradings are each fetched in a single
+        query for the whole batch and the ML engines are called once per
+        batch. Grading uses each device's most recent stored record.
+        
+        Args:
+            device_ids: Device identifiers
+            db: Database session
+            include_grading: Whether to include the latest grading
+            include_pricing: Whether to run pricing analysis
+        
+        Returns:
+            Analysis reports keyed by device_id (unknown devices are omitted)
+        """
+        logger.info(f"Starting batch analysis for {len(device_ids)} devices")
+        
+        writer = BulkWriter()
+        
+        # 1. Get device info
+        result = await db.execute(select(Device).where(Device.id.in_(device_ids)))
+        devices = result.scalars().all()
+        if not devices:
+            return {}
+        
+        ids = [device.id for device in devices]
+        
+        # 2. Get telemetry history (last 30 days), grouped per device
+        cutoff_date = datetime.utcnow() - timedelta(days=30)
         result = await db.execute(
-            select(Device).where(Device.id == device_id)
+            select(TelemetrySnapshot.device_id, *TELEMETRY_HISTORY_COLUMNS)
+            .where(TelemetrySnapshot.device_id.in_(ids))
+            .where(TelemetrySnapshot.timestamp >= cutoff_date)
+            .order_by(TelemetrySnapshot.device_id, TelemetrySnapshot.timestamp)
+        )
+        histories = {
+            device_id: columns_from_rows([row[1:] for row in rows])
+            for device_id, rows in groupby(result.all(), key=lambda row: row[0])
+        }
+        empty_history = columns_from_rows([])
+        
+        # 3. Get latest grading per device (DISTINCT ON)
+        gradings = {}
+        if include_grading:
+            result = await db.execute(
+                select(GradingRecord)
+                .where(GradingRecord.device_id.in_(ids))
+                .distinct(GradingRecord.device_id)
+                .order_by(GradingRecord.device_id, desc(GradingRecord.timestamp))
+            )
+            gradings = {
+                grading.device_id: self._grading_to_dict(grading)
+                for grading in result.scalars()
+            }
+        
+        # 4. Run health prediction for the whole batch
+        health_predictions = await get_health_predictor().predict_rul_batch(
+            [histories.get(device.id, empty_history) for device in devices]
         )
+        
+        # 5. Run pricing for the whole batch
+        price_estimates = [None] * len(devices)
+        if include_pricing:
+            price_estimates = await get_pricing_engine().estimate_price_batch(
+                self._pricing_features(
+                    devices,
+                    [histories.get(device.id, empty_history) for device in devices],
+                    [gradings.get(device.id) for device in devices]
+                )
+            )
+        
+        # 6. Generate recommendations and compile reports
+        reports = {}
+        for device, health_prediction, price_estimate in zip(
+            devices, health_predictions, price_estimates
+        ):
+            grading_result = gradings.get(device.id)
+            recommendations = await self._generate_recommendations(
+                device, health_prediction, grading_result, price_estimate
+            )
+            analysis_report = self._compile_report(
+                device, health_prediction, grading_result, price_estimate, recommendations
+            )
+            
+            if price_estimate is not None:
+                await self._save_price_estimate(device.id, price_estimate, writer, db)
+            await self._save_analysis_record(
+                device.id, analysis_report, include_grading, include_pricing, writer, db
+            )
+            reports[device.id] = analysis_report
+        
+        # 7. Persist everything in one go
+        await writer.flush(db)
+        await db.commit()
+        
+        logger.info(f"Batch analysis complete for {len(reports)} devices")
+        return reports
+    
+    async def _get_device(
+        self,
+        device_id: str,
+        db: AsyncSession,
+        load_grading: bool = True
+    ) -> Optional[Device]:
+        """
+        Retrieve device with its latest grading.
+        
+        Args:
+            device_id: Device identifier
+            db: Database session
+            load_grading: Whether to load the most recent grading record
+        """
+        statement = select(Device).where(Device.id == device_id)
+        if load_grading:
+            statement = statement.options(selectinload(Device.latest_grading))
+        
+        result = await db.execute(statement)
         return result.scalar_one_or_none()
     
+    async def _get_cached_device(
+        self, device_id: str
+    ) -> Tuple[Optional[Device], Optional[Dict]]:
+        """
+        Get the device and its latest grading from cache.
+        
+        Returns:
+            Detached device (or None on miss) and latest grading dict (or None)
+        """
+        device_data, latest_grading = await cache_service.get_many_json(
+            device_cache_key(device_id), latest_grading_cache_key(device_id)
+        )
+        if device_data is None:
+            return None, latest_grading
+        
+        for column in Device.__table__.columns:
+            if isinstance(column.type, TIMESTAMP) and device_data.get(column.key):
+                # Stored as UTC with a "Z"; columns hold naive UTC datetimes
+                device_data[column.key] = datetime.fromisoformat(
+                    device_data[column.key]
+                ).replace(tzinfo=None)
+        
+        return Device(**device_data), latest_grading
+    
+    async def _cache_device(self, device: Device, latest_grading: Optional[Dict]):
+        """Cache the device row and, if known, its latest grading."""
+        device_data = {c.key: getattr(device, c.key) for c in Device.__table__.columns}
+        await cache_service.set_json(
+            device_cache_key(device.id), device_data, settings.DEVICE_CACHE_TTL_SECONDS
+        )
+        if latest_grading is not None:
+            await cache_service.set_json(
+                latest_grading_cache_key(device.id),
+                latest_grading,
+                settings.DEVICE_CACHE_TTL_SECONDS
+            )
+    
     async def _get_telemetry_history(
         self, device_id: str, db: AsyncSession, days: int = 30
-    ) -> List[Dict]:
-        """Get telemetry history for specified days."""
+    ) -> TelemetryColumns:
+        """Get telemetry history for specified days as columns."""
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        result = await db.execute(
-            select(TelemetrySnapshot)
+        # Server-side cursor: rows arrive in chunks instead of one big buffer,
+        # and each chunk becomes a set of arrays without building ORM objects
+        result = await db.stream(
+            select(*TELEMETRY_HISTORY_COLUMNS)
             .where(TelemetrySnapshot.device_id == device_id)
             .where(TelemetrySnapshot.timestamp >= cutoff_date)
             .order_by(TelemetrySnapshot.timestamp)
+            .execution_options(yield_per=1000)
         )
         
-        snapshots = result.scalars().all()
-        
-        return [
-            {
-                'timestamp': s.timestamp,
-                'battery_cycle_count': s.battery_cycle_count,
-                'battery_health_percentage': s.battery_health_percentage,
-                'battery_temperature': s.battery_temperature,
-                'thermal_events_count': s.thermal_events_count,
-                'crash_count': s.crash_count,
-            }
-            for s in snapshots
-        ]
+        return concat_columns([columns_from_rows(rows) async for rows in result.partitions()])
     
     async def _get_latest_grading(
         self, device_id: str, db: AsyncSession
     ) -> Optional[Dict]:
-        """Get most recent grading record."""
-        result = await db.execute(
+        """Get most recent grading record, caching it for later analyses."""
+        grading = await db.scalar(
             select(GradingRecord)
             .where(GradingRecord.device_id == device_id)
             .order_by(desc(GradingRecord.timestamp))
             .limit(1)
         )
-        
-        grading = result.scalar_one_or_none()
         if not grading:
             return None
         
+        latest_grading = self._grading_to_dict(grading)
+        await cache_service.set_json(
+            latest_grading_cache_key(device_id),
+            latest_grading,
+            settings.DEVICE_CACHE_TTL_SECONDS
+        )
+        return latest_grading
+    
+    def _grading_to_dict(self, grading: GradingRecord) -> Dict:
+        """Convert a grading record to the dict used in analysis reports."""
         return {
             'grade': grading.grade,
             'confidence_score': grading.confidence_score,
@@ -155,14 +352,16 @@ class DeviceAnalysisService:
             'screen_cracks_count': grading.screen_cracks_count,
             'body_scratches_count': grading.body_scratches_count,
             'body_dents_count': grading.body_dents_count,
-            'timestamp': grading.timestamp.isoformat(),
+            'timestamp': grading.timestamp,
         }
     
     async def _save_grading_record(
-        self, device_id: str, grading_result: Dict, db: AsyncSession
+        self, device_id: str, grading_result: Dict, writer: BulkWriter, db: AsyncSession
     ):
-        """Save grading record to database."""
-        grading_record = GradingRecord(
+        """Queue grading record for the bulk writer."""
+        await writer.add(
+            GradingRecord,
+            db,
             device_id=device_id,
             grade=grading_result['grade'],
             confidence_score=grading_result['confidence_score'],
@@ -174,57 +373,108 @@ class DeviceAnalysisService:
             cv_model_version=grading_result['cv_model_version'],
             detection_results=grading_result['detection_results'],
         )
-        db.add(grading_record)
-        await db.commit()
+    
+    async def _save_analysis_record(
+        self,
+        device_id: str,
+        analysis_report: Dict,
+        include_grading: bool,
+        include_pricing: bool,
+        writer: BulkWriter,
+        db: AsyncSession
+    ):
+        """Queue analysis outputs for the bulk writer."""
+        await writer.add(
+            AnalysisRecord,
+            db,
+            device_id=device_id,
+            include_grading=include_grading,
+            include_pricing=include_pricing,
+            health_prediction=analysis_report['health_prediction'],
+            grading=analysis_report['grading'],
+            price_estimate=analysis_report['price_estimate'],
+            recommendations=analysis_report['recommendations'],
+        )
     
     async def _estimate_price(
         self,
         device: Device,
-        telemetry_history: List[Dict],
+        telemetry_history: TelemetryColumns,
         grading_result: Optional[Dict],
+        writer: BulkWriter,
         db: AsyncSession
     ) -> Dict[str, Any]:
         """Estimate device price."""
-        # Get latest telemetry
-        latest_telemetry = telemetry_history[-1] if telemetry_history else {}
+        price_estimate = get_pricing_engine().estimate_price_sync(
+            **self._pricing_features([device], [telemetry_history], [grading_result])[0]
+        )
         
-        # Calculate age
-        age_days = (datetime.utcnow() - device.purchase_date).days
+        await self._save_price_estimate(device.id, price_estimate, writer, db)
+        
+        return price_estimate
+    
+    def _pricing_features(
+        self,
+        devices: List[Device],
+        telemetry_histories: List[TelemetryColumns],
+        grading_results: List[Optional[Dict]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Build pricing engine inputs for each device.
         
-        # Grade score mapping
-        grade_scores = {'excellent': 4, 'good': 3, 'fair': 2, 'poor': 1}
-        grade_score = 3  # Default to good
-        screen_damage = 0
-        body_damage = 0
+        Damage scores for the whole batch come from one (N, 4) x (4, 2)
+        matrix product of damage counts and DAMAGE_WEIGHTS.
+        """
+        now = datetime.utcnow()
         
-        if grading_result:
-            grade_score = grade_scores.get(grading_result.get('grade', 'good'), 3)
-            screen_damage = (
-                grading_result.get('screen_scratches_count', 0) * 2 +
-                grading_result.get('screen_cracks_count', 0) * 5
-            )
-            body_damage = (
-                grading_result.get('body_scratches_count', 0) * 1 +
-                grading_result.get('body_dents_count', 0) * 3
-            )
+        # Counts go straight into one flat buffer, no per-device lists
+        damage_counts = np.fromiter(
+            (
+                grading.get(field, 0) if grading else 0
+                for grading in grading_results
+                for field in DAMAGE_COUNT_FIELDS
+            ),
+            dtype=np.int64,
+            count=len(grading_results) * len(DAMAGE_COUNT_FIELDS)
+        ).reshape(-1, len(DAMAGE_COUNT_FIELDS))
+        damage_scores = np.minimum(damage_counts @ DAMAGE_WEIGHTS, 10).tolist()
         
-        # Estimate price
-        price_estimate = await pricing_engine.estimate_price(
-            device_model=device.model,
-            manufacturer=device.manufacturer,
-            age_days=age_days,
-            storage_gb=device.storage_gb or 128,
-            ram_gb=device.ram_gb or 6,
-            battery_health=latest_telemetry.get('battery_health_percentage', 85),
-            battery_cycles=latest_telemetry.get('battery_cycle_count', 100),
-            grade_score=grade_score,
-            screen_damage_score=min(screen_damage, 10),
-            body_damage_score=min(body_damage, 10),
-        )
+        features = []
+        for device, telemetry_history, grading_result, (screen_damage, body_damage) in zip(
+            devices, telemetry_histories, grading_results, damage_scores
+        ):
+            # Get latest telemetry
+            battery_health, battery_cycles = 85, 100
+            if history_length(telemetry_history):
+                battery_health = float(telemetry_history['battery_health_percentage'][-1])
+                battery_cycles = int(telemetry_history['battery_cycle_count'][-1])
+            
+            # Missing gradings and unknown grades both default to good
+            grade_score = GRADE_SCORES.get(grading_result.get('grade'), 3) if grading_result else 3
+            
+            features.append({
+                'device_model': device.model,
+                'manufacturer': device.manufacturer,
+                'age_days': (now - device.purchase_date).days,
+                'storage_gb': device.storage_gb or 128,
+                'ram_gb': device.ram_gb or 6,
+                'battery_health': battery_health,
+                'battery_cycles': battery_cycles,
+                'grade_score': grade_score,
+                'screen_damage_score': screen_damage,
+                'body_damage_score': body_damage,
+            })
         
-        # Save to database
-        price_record = PriceEstimate(
-            device_id=device.id,
+        return features
+    
+    async def _save_price_estimate(
+        self, device_id: str, price_estimate: Dict, writer: BulkWriter, db: AsyncSession
+    ):
+        """Queue price estimate for the bulk writer."""
+        await writer.add(
+            PriceEstimate,
+            db,
+            device_id=device_id,
             estimated_resale_price=price_estimate['estimated_resale_price'],
             market_average_price=price_estimate['market_average_price'],
             confidence_interval_lower=price_estimate['confidence_interval_lower'],
@@ -232,10 +482,30 @@ class DeviceAnalysisService:
             model_version=price_estimate['model_version'],
             feature_importance=price_estimate['feature_importance'],
         )
-        db.add(price_record)
-        await db.commit()
-        
-        return price_estimate
+    
+    def _compile_report(
+        self,
+        device: Device,
+        health_prediction: Dict,
+        grading_result: Optional[Dict],
+        price_estimate: Optional[Dict],
+        recommendations: Dict
+    ) -> Dict[str, Any]:
+        """Assemble the analysis report returned to clients."""
+        return {
+            'device_id': device.id,
+            'timestamp': datetime.utcnow(),
+            'device_info': {
+                'model': device.model,
+                'manufacturer': device.manufacturer,
+                'age_days': (datetime.utcnow() - device.purchase_date).days,
+                'status': device.status,
+            },
+            'health_prediction': health_prediction,
+            'grading': grading_result,
+            'price_estimate': price_estimate,
+            'recommendations': recommendations,
+        }
     
     async def _generate_recommendations(
         self,
@@ -0,0 +1,68 @@
+"""Vectorized circularity and carbon footprint scoring for passport batches."""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def circularity_batch(
+    repairs: np.ndarray,
+    refurbishments: np.ndarray,
+    parts_harvested: np.ndarray,
+    recycling_events: np.ndarray,
+    usage_years: np.ndarray
+) -> np.ndarray:
+    """
+    Circularity scores (0-100) for many passports at once.
+
+    Same formula as SolanaService.calculate_circularity_score, evaluated
+    element-wise over equally sized arrays. Terms are accumulated into one
+    buffer and the cap is applied in place, so the saturating min runs as a
+    single SIMD ufunc pass with no extra temporaries.
+    """
+    score = usage_years.astype(np.int64)  # Truncate like int()
+    score += 70
+    score += repairs * 5
+    score += refurbishments * 10
+    score += parts_harvested * 8
+    score += recycling_events * 15
+    np.minimum(score, 100, score)  # Positional out: Numba rejects out=
+    return score
+
+
+def carbon_footprint_batch(
+    usage_years: np.ndarray,
+    repairs: np.ndarray,
+    refurbishments: np.ndarray,
+    parts_harvested: np.ndarray,
+    manufacturing_emissions: float = 70.0,
+    transport_emissions: float = 5.0
+) -> np.ndarray:
+    """
+    Carbon footprints (kg CO2e) for many passports at once.
+
+    Same formula as SolanaService.calculate_carbon_footprint, evaluated
+    element-wise over equally sized arrays.
+    """
+    total_emissions = usage_years * 2.0
+    total_emissions += manufacturing_emissions + transport_emissions
+    total_emissions -= repairs * 5.0
+    total_emissions -= refurbishments * 30.0
+    total_emissions -= parts_harvested * 15.0
+    np.maximum(total_emissions, 0.0, total_emissions)
+    return total_emissions
+
+
+if njit is not None:
+    # Compiled per argument dtype; SolanaService always passes int64 counts
+    # and float64 years, so compile that signature now rather than on the
+    # first fleet recomputation
+    circularity_batch = njit(cache=True)(circularity_batch)
+    carbon_footprint_batch = njit(cache=True)(carbon_footprint_batch)
+    _counts = np.zeros(1, dtype=np.int64)
+    _years = np.zeros(1, dtype=np.float64)
+    circularity_batch(_counts, _counts, _counts, _counts, _years)
+    carbon_footprint_batch(_years, _counts, _counts, _counts)
+    del _counts, _years
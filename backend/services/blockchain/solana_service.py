@@ -1,9 +1,14 @@
 """Solana blockchain service for Digital Passports."""
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Sequence
 from datetime import datetime
 import json
 
+import numpy as np
+
+from services.blockchain.scoring_kernels import circularity_batch, carbon_footprint_batch
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,11 +29,13 @@ class SolanaService:
         self.network = network
         self.is_connected = False
         
-        # In production, initialize Solana client
-        # from solana.rpc.api import Client
-        # from solders.keypair import Keypair
-        # self.client = Client(rpc_url)
-        # self.keypair = Keypair.from_base58_string(private_key)
+        # In production, initialize Solana client. Import the SDK here, and
+        # only when signing is configured, to keep it out of process startup
+        # if self.private_key:
+        #     from solana.rpc.api import Client
+        #     from solders.keypair import Keypair
+        #     self.client = Client(rpc_url)
+        #     self.keypair = Keypair.from_base58_string(private_key)
         
         logger.info(f"Solana Service initialized (Network: {network})")
     
@@ -41,6 +48,11 @@ class SolanaService:
         """
         Mint a Digital Passport NFT on Solana blockchain.
         
+        Idempotent per device_id through on-chain state: the mint account
+        address is derived from the device ID, so a retry from any worker,
+        before or after a restart, targets the same account and reuses it
+        if it already exists instead of minting a second NFT.
+        
         Args:
             device_id: Unique device identifier
             owner_address: Wallet address of the owner
@@ -49,24 +61,42 @@ class SolanaService:
         Returns:
             Mint address and transaction signature
         """
-        logger.info(f"Minting passport for device {device_id}")
+        mint_address = self.passport_mint_address(device_id)
         
-        # In production, this would mint an actual NFT
-        # tx = await self._create_nft_mint(metadata)
+        # In production, reuse the mint if a previous attempt created it,
+        # otherwise mint an actual NFT at the derived address
+        # existing = await self.client.get_account_info(mint_address)
+        # if existing.value is not None:
+        #     logger.info(f"Passport already minted for device {device_id}")
+        #     return await self._existing_mint_result(mint_address)
+        # tx = await self._create_nft_mint(mint_address, metadata)
         # signature = await self.client.send_transaction(tx)
         
+        logger.info(f"Minting passport for device {device_id}")
+        
         # Mock minting for development
-        mock_mint_address = f"NFT{device_id[:8]}{hash(device_id) % 10000}"
-        mock_signature = f"sig_{hash(device_id + owner_address) % 1000000}"
+        mock_signature = f"sig_{self._mock_digest(device_id + owner_address)}"
         
-        logger.info(f"Passport minted: {mock_mint_address}")
+        logger.info(f"Passport minted: {mint_address}")
         
-        return {
-            'mint_address': mock_mint_address,
+        mint_result = {
+            'mint_address': mint_address,
             'transaction_signature': mock_signature,
             'network': self.network,
             'explorer_url': f"https://explorer.solana.com/tx/{mock_signature}?cluster={self.network}"
         }
+        
+        return mint_result
+    
+    def passport_mint_address(self, device_id: str) -> str:
+        """
+        Deterministic mint account address for a device's passport.
+        
+        In production this is the program-derived address for the seeds
+        (b"passport", device_id), e.g.
+        Pubkey.find_program_address([b"passport", device_id.encode()], PROGRAM_ID).
+        """
+        return f"NFT{self._mock_digest(device_id, 12)}"
     
     async def transfer_ownership(
         self,
@@ -81,7 +111,7 @@ class SolanaService:
         # tx = await self._create_transfer_tx(mint_address, to_address)
         # signature = await self.client.send_transaction(tx)
         
-        mock_signature = f"sig_transfer_{hash(mint_address + to_address) % 1000000}"
+        mock_signature = f"sig_transfer_{self._mock_digest(mint_address + to_address)}"
         
         return {
             'transaction_signature': mock_signature,
@@ -106,7 +136,7 @@ class SolanaService:
         # metadata_uri = await self._upload_to_arweave(event_data)
         # tx = await self._update_nft_metadata(mint_address, metadata_uri)
         
-        mock_signature = f"sig_event_{hash(mint_address + event_type) % 1000000}"
+        mock_signature = f"sig_event_{self._mock_digest(mint_address + event_type)}"
         
         return {
             'transaction_signature': mock_signature,
@@ -138,6 +168,15 @@ class SolanaService:
             }
         }
     
+    def _mock_digest(self, value: str, length: int = 16) -> str:
+        """
+        Deterministic hex digest for mock addresses and signatures.
+        
+        Unlike hash(), the result is stable across processes (no
+        PYTHONHASHSEED randomization) and isn't truncated to a few digits.
+        """
+        return hashlib.blake2b(value.encode(), digest_size=length // 2).hexdigest()
+    
     def calculate_circularity_score(
         self,
         repairs: int,
@@ -193,6 +232,40 @@ class SolanaService:
         total_emissions -= parts_harvested * 15.0  # Parts harvesting saves 15kg
         
         return max(total_emissions, 0)
+    
+    def calculate_circularity_scores_batch(
+        self,
+        repairs: Sequence[int],
+        refurbishments: Sequence[int],
+        parts_harvested: Sequence[int],
+        recycling_events: Sequence[int],
+        usage_years: Sequence[float]
+    ) -> List[int]:
+        """Calculate circularity scores for many passports (see calculate_circularity_score)."""
+        scores = circularity_batch(
+            np.asarray(repairs, dtype=np.int64),
+            np.asarray(refurbishments, dtype=np.int64),
+            np.asarray(parts_harvested, dtype=np.int64),
+            np.asarray(recycling_events, dtype=np.int64),
+            np.asarray(usage_years, dtype=np.float64)
+        )
+        return scores.tolist()
+    
+    def calculate_carbon_footprints_batch(
+        self,
+        usage_years: Sequence[float],
+        repairs: Sequence[int],
+        refurbishments: Sequence[int],
+        parts_harvested: Sequence[int]
+    ) -> List[float]:
+        """Calculate carbon footprints for many passports (see calculate_carbon_footprint)."""
+        footprints = carbon_footprint_batch(
+            np.asarray(usage_years, dtype=np.float64),
+            np.asarray(repairs, dtype=np.int64),
+            np.asarray(refurbishments, dtype=np.int64),
+            np.asarray(parts_harvested, dtype=np.int64)
+        )
+        return footprints.tolist()
 
 
 # Singleton instance
@@ -0,0 +1,235 @@
+"""Postgres-backed queue that moves blockchain calls off the request path."""
+import asyncio
+import logging
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from db.database import AsyncSessionLocal
+from models.database import BlockchainTransaction
+from services.blockchain.solana_service import get_solana_service
+
+logger = logging.getLogger(__name__)
+
+
+class BlockchainTxQueue:
+    """
+    Transactional outbox for on-chain operations.
+
+    Requests insert a pending row in the same transaction as their own
+    writes and return its ID straight away; background workers submit the
+    operation to Solana and record the signature. Rows are claimed with
+    FOR UPDATE SKIP LOCKED and leased for lease_seconds, so any number of API
+    workers can consume the queue without double-submitting, and no
+    connection or row lock is held while an RPC is in flight.
+    """
+
+    def __init__(
+        self,
+        poll_seconds: float = 1.0,
+        batch_size: int = 50,
+        max_attempts: int = 5,
+        lease_seconds: int = 120,
+        retry_backoff_seconds: float = 5.0
+    ):
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_backoff_seconds = retry_backoff_seconds
+
+    def enqueue_lifecycle_event(
+        self,
+        db: AsyncSession,
+        passport_id: str,
+        mint_address: str,
+        event_type: str,
+        event_data: Dict[str, Any]
+    ) -> str:
+        """
+        Queue a lifecycle event for on-chain recording.
+
+        The row is added to the caller's session and becomes visible to
+        workers when the caller commits.
+
+        Returns:
+            Transaction ID that can be polled for status
+        """
+        tx_id = uuid.uuid4().hex
+        db.add(BlockchainTransaction(
+            id=tx_id,
+            passport_id=passport_id,
+            operation="record_lifecycle_event",
+            mint_address=mint_address,
+            payload={'event_type': event_type, 'event_data': event_data},
+        ))
+        return tx_id
+
+    async def process_pending(self) -> int:
+        """
+        Submit one batch of pending operations.
+
+        Rows are claimed (marked in_flight under a lease) in one short
+        transaction, submitted with no session or connection held, and each
+        outcome is written in its own short transaction. A claim whose lease
+        runs out, e.g. because the worker died mid-RPC, is picked up again.
+        Failed attempts are retried after an exponential backoff.
+
+        Returns:
+            Number of operations processed
+        """
+        solana_service = get_solana_service(
+            settings.SOLANA_RPC_URL,
+            settings.SOLANA_PRIVATE_KEY,
+            settings.SOLANA_NETWORK
+        )
+
+        claimed = await self._claim_batch()
+
+        for tx_id, mint_address, payload, attempts in claimed:
+            try:
+                tx_result = await solana_service.record_lifecycle_event(
+                    mint_address=mint_address,
+                    event_type=payload['event_type'],
+                    event_data=payload['event_data']
+                )
+            except Exception as e:
+                logger.warning(f"Blockchain tx {tx_id} attempt {attempts} failed: {e}")
+                if attempts >= self.max_attempts:
+                    await self._finish(tx_id, attempts, status="failed", error=str(e))
+                else:
+                    await self._finish(
+                        tx_id,
+                        attempts,
+                        status="pending",
+                        error=str(e),
+                        next_attempt_at=func.now() + self._retry_delay(attempts)
+                    )
+                continue
+
+            await self._finish(
+                tx_id,
+                attempts,
+                status="confirmed",
+                transaction_signature=tx_result['transaction_signature'],
+                explorer_url=tx_result['explorer_url'],
+                error=None
+            )
+
+        return len(claimed)
+
+    def _retry_delay(self, attempts: int) -> timedelta:
+        """Backoff before retrying after the given number of failed attempts."""
+        return timedelta(seconds=self.retry_backoff_seconds * 2 ** (attempts - 1))
+
+    async def _claim_batch(self) -> List[Tuple]:
+        """
+        Lease up to batch_size due pending (or lease-expired) rows to this worker.
+
+        The attempt counter is bumped at claim time so an operation that
+        keeps killing its worker still runs out of attempts. It also acts as
+        the claim's fencing token: only the latest claimant can record an
+        outcome.
+
+        Returns:
+            (id, mint_address, payload, attempts) per claimed row
+        """
+        now = func.now()
+        due = and_(
+            BlockchainTransaction.status == "pending",
+            or_(
+                BlockchainTransaction.next_attempt_at.is_(None),
+                BlockchainTransaction.next_attempt_at <= now
+            )
+        )
+        lease_expired = and_(
+            BlockchainTransaction.status == "in_flight",
+            BlockchainTransaction.lease_expires_at < now
+        )
+
+        async with AsyncSessionLocal() as db:
+            # Expired claims with no attempts left are not retried
+            await db.execute(
+                update(BlockchainTransaction)
+                .where(lease_expired, BlockchainTransaction.attempts >= self.max_attempts)
+                .values(status="failed", error="Lease expired on final attempt", lease_expires_at=None)
+            )
+
+            candidates = (
+                select(BlockchainTransaction.id)
+                .where(or_(due, lease_expired))
+                .order_by(BlockchainTransaction.created_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                update(BlockchainTransaction)
+                .where(BlockchainTransaction.id.in_(candidates))
+                .values(
+                    status="in_flight",
+                    attempts=BlockchainTransaction.attempts + 1,
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds)
+                )
+                .returning(
+                    BlockchainTransaction.id,
+                    BlockchainTransaction.mint_address,
+                    BlockchainTransaction.payload,
+                    BlockchainTransaction.attempts
+                )
+                .execution_options(synchronize_session=False)
+            )
+            claimed = result.all()
+            await db.commit()
+
+        return claimed
+
+    async def _finish(self, tx_id: str, attempts: int, **values):
+        """
+        Record the outcome of one claimed operation and release its lease.
+
+        Matches only the claim made at this attempt count, so a worker whose
+        lease expired and was re-claimed cannot overwrite the newer claim.
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(BlockchainTransaction)
+                .where(
+                    BlockchainTransaction.id == tx_id,
+                    BlockchainTransaction.status == "in_flight",
+                    BlockchainTransaction.attempts == attempts
+                )
+                .values(lease_expires_at=None, **values)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+        if result.rowcount == 0:
+            logger.warning(f"Blockchain tx {tx_id} attempt {attempts} outcome dropped: claim was taken over")
+
+    async def run_worker(self):
+        """Background task draining the queue until cancelled."""
+        while True:
+            try:
+                processed = await self.process_pending()
+            except Exception as e:
+                logger.error(f"Blockchain queue worker error: {e}")
+                processed = 0
+
+            # Keep draining while there is a backlog, otherwise poll
+            if processed < self.batch_size:
+                await asyncio.sleep(self.poll_seconds)
+
+
+# Singleton instance
+blockchain_tx_queue = BlockchainTxQueue(
+    poll_seconds=settings.BLOCKCHAIN_QUEUE_POLL_SECONDS,
+    batch_size=settings.BLOCKCHAIN_QUEUE_BATCH_SIZE,
+    max_attempts=settings.BLOCKCHAIN_QUEUE_MAX_ATTEMPTS,
+    lease_seconds=settings.BLOCKCHAIN_QUEUE_LEASE_SECONDS,
+    retry_backoff_seconds=settings.BLOCKCHAIN_QUEUE_RETRY_BACKOFF_SECONDS
+)
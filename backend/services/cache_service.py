@@ -0,0 +1,86 @@
+"""Redis-backed cache for expensive, short-lived results."""
+import logging
+from typing import Any, List, Optional
+
+import orjson
+import redis.asyncio as redis
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Same encoding as the API's FastORJSONResponse, so a cached value renders
+# exactly like a freshly computed one
+CACHE_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+def device_cache_key(device_id: str) -> str:
+    """Cache key for a device row."""
+    return f"device:{device_id}"
+
+
+def latest_grading_cache_key(device_id: str) -> str:
+    """Cache key for a device's most recent grading."""
+    return f"latest_grading:{device_id}"
+
+
+class CacheService:
+    """
+    JSON cache on top of Redis.
+
+    Values are encoded with orjson, so datetimes are stored as ISO 8601
+    strings (naive ones as UTC with a "Z" suffix) and come back as strings.
+
+    Cache errors are logged and treated as misses so that a Redis outage
+    degrades to uncached behaviour instead of failing requests.
+    """
+
+    def __init__(self, redis_url: str, max_connections: int = 50):
+        self.client = redis.from_url(
+            redis_url,
+            max_connections=max_connections,
+            decode_responses=True
+        )
+        logger.info("Cache Service initialized")
+
+    async def get_json(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on miss."""
+        try:
+            raw = await self.client.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+            return None
+
+        return orjson.loads(raw) if raw is not None else None
+
+    async def get_many_json(self, *keys: str) -> List[Optional[Any]]:
+        """Return cached values for keys in one round trip (None on miss)."""
+        try:
+            raws = await self.client.mget(keys)
+        except redis.RedisError as e:
+            logger.warning(f"Cache read failed for {keys}: {e}")
+            return [None] * len(keys)
+
+        return [orjson.loads(raw) if raw is not None else None for raw in raws]
+
+    async def set_json(self, key: str, value: Any, ttl: int):
+        """Store value under key for ttl seconds."""
+        try:
+            await self.client.setex(key, ttl, orjson.dumps(value, option=CACHE_JSON_OPTIONS))
+        except redis.RedisError as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+
+    async def delete(self, *keys: str):
+        """Invalidate keys."""
+        try:
+            await self.client.delete(*keys)
+        except redis.RedisError as e:
+            logger.warning(f"Cache invalidation failed for {keys}: {e}")
+
+    async def close(self):
+        """Close the Redis connection pool."""
+        await self.client.aclose()
+
+
+# Singleton instance
+cache_service = CacheService(settings.REDIS_URL, settings.REDIS_MAX_CONNECTIONS)
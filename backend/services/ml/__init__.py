@@ -1 +1,39 @@
-"""Package initialization."""
+"""Package initialization.
+
+Engines are imported on first use so that processes (and requests) that
+never touch ML don't pay for loading model frameworks at startup. The API
+server loads and warms them up front via warmup_engines (ML_WARMUP).
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_health_predictor():
+    """Get the health predictor singleton, importing it on first call."""
+    from services.ml.health_predictor import health_predictor
+    return health_predictor
+
+
+@lru_cache(maxsize=None)
+def get_grading_engine():
+    """Get the grading engine singleton, importing it on first call."""
+    from services.ml.grading_engine import grading_engine
+    return grading_engine
+
+
+@lru_cache(maxsize=None)
+def get_pricing_engine():
+    """Get the pricing engine singleton, importing it on first call."""
+    from services.ml.pricing_engine import pricing_engine
+    return pricing_engine
+
+
+def warmup_engines():
+    """
+    Load every engine and run it once on synthetic input (blocking).
+    
+    Moves model loading, JIT compilation and first-inference overhead
+    from the first real request to startup.
+    """
+    for get_engine in (get_health_predictor, get_grading_engine, get_pricing_engine):
+        get_engine().warmup()
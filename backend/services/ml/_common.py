@@ -0,0 +1,70 @@
+"""Helpers shared by the ML engines."""
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+from config.settings import settings
+
+# Root of every engine's random stream. With ML_RANDOM_SEED set, mock and
+# simulated outputs repeat across runs (for the same order of threads).
+_SEED_SEQUENCE = np.random.SeedSequence(settings.ML_RANDOM_SEED)
+_spawn_lock = threading.Lock()
+
+
+class _ThreadRNG(threading.local):
+    """One Generator per thread, each an independent child of _SEED_SEQUENCE."""
+
+    def __init__(self):
+        with _spawn_lock:
+            seed = _SEED_SEQUENCE.spawn(1)[0]
+        self.generator = np.random.default_rng(seed)
+
+
+_thread_rng = _ThreadRNG()
+
+
+def get_rng() -> np.random.Generator:
+    """
+    Random generator for the calling thread.
+
+    NumPy Generators are not thread-safe and the engines run in worker
+    threads, so each thread draws from its own stream.
+    """
+    return _thread_rng.generator
+
+
+def first_existing_path(*paths: Optional[str]) -> Optional[str]:
+    """
+    First of the given model artifact paths that exists on disk.
+
+    Engines list their preferred backend first; None means no artifact is
+    deployed and the engine falls back to its heuristic.
+    """
+    for path in paths:
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict for constant results shared across calls.
+
+    Unlike MappingProxyType it is still a dict, so orjson, pydantic and the
+    JSON(B) columns serialize it natively. Use dict(frozen) for a mutable
+    copy.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def copy(self) -> dict:
+        return dict(self)
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
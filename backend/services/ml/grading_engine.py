@@ -1,10 +1,100 @@
 """Surface grading engine using YOLOv10 for damage detection."""
+import ast
+import asyncio
+import io
 import logging
-from typing import Dict, List, Tuple, Any
-import random
+import operator
+import os
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Tuple, Any
+import numpy as np
+
+from config.settings import settings
+from services.ml._common import FrozenDict, first_existing_path, get_rng
 
 logger = logging.getLogger(__name__)
 
+# Detection categories reported by the engine (YOLO class names)
+DAMAGE_CATEGORIES = ('screen_scratches', 'screen_cracks', 'body_scratches', 'body_dents')
+
+# Mock detection parameters, in DAMAGE_CATEGORIES order: max count per
+# category, category confidence range, bounding box (x, y, width, height)
+# lower and upper bounds (inclusive) and box confidence range
+_MOCK_MAX_COUNTS = np.array([5, 2, 8, 3])
+_MOCK_CONFIDENCE_RANGES = np.array([[0.85, 0.95], [0.88, 0.96], [0.82, 0.93], [0.80, 0.92]])
+_MOCK_BOX_LOWS = np.array([[100, 100, 20, 10], [100, 100, 50, 5], [50, 50, 10, 5], [50, 50, 15, 15]])
+_MOCK_BOX_HIGHS = np.array([[400, 600, 100, 50], [400, 600, 200, 20], [450, 650, 60, 30], [450, 650, 40, 40]])
+_MOCK_BOX_CONFIDENCE_RANGES = np.array([[0.80, 0.95], [0.85, 0.96], [0.78, 0.92], [0.75, 0.90]])
+
+# Damage score weight per category (DAMAGE_CATEGORIES order): cracks are
+# very severe, scratches less so
+_DAMAGE_WEIGHTS = (3, 15, 2, 5)
+
+# Grades by damage score: 0 excellent, 1-10 good, 11-30 fair, 31+ poor
+_DAMAGE_THRESHOLDS = (1, 11, 31)
+_GRADES = ('excellent', 'good', 'fair', 'poor')
+_GRADE_CONFIDENCES = (0.95, 0.92, 0.89, 0.87)
+
+# ONNX Runtime providers in order of preference. TensorRT builds an FP16
+# engine on first use and caches it next to the model.
+_ONNX_PROVIDERS = ('TensorrtExecutionProvider', 'CUDAExecutionProvider', 'CPUExecutionProvider')
+
+# Above this many candidate boxes NMS runs in torchvision when available
+_TORCH_NMS_MIN_BOXES = 4096
+
+
+def _numpy_nms(dets: np.ndarray, scores: np.ndarray, thresh: float) -> List[int]:
+    """
+    Greedy non-maximum suppression.
+    
+    Each kept box is compared against all remaining candidates in one set
+    of vectorized operations, so the Python loop runs once per kept box
+    rather than once per pair.
+    
+    Args:
+        dets: (N, 4) boxes as x1, y1, x2, y2
+        scores: (N,) box scores
+        thresh: IoU above which the lower-scoring box is dropped
+    
+    Returns:
+        Indices of kept boxes, highest score first
+    """
+    x1, y1, x2, y2 = dets[:, 0], dets[:, 1], dets[:, 2], dets[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+        
+        xx1 = np.maximum(x1[i], x1[rest])
+        yy1 = np.maximum(y1[i], y1[rest])
+        xx2 = np.minimum(x2[i], x2[rest])
+        yy2 = np.minimum(y2[i], y2[rest])
+        
+        inter = np.maximum(0.0, xx2 - xx1) * np.maximum(0.0, yy2 - yy1)
+        ovr = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        
+        order = rest[ovr <= thresh]
+    
+    return keep
+
+
+def _nms(dets: np.ndarray, scores: np.ndarray, thresh: float) -> List[int]:
+    """NMS in NumPy, or in torchvision for very large candidate sets."""
+    if len(dets) >= _TORCH_NMS_MIN_BOXES:
+        try:
+            import torch
+            from torchvision.ops import nms
+        except ImportError:
+            pass
+        else:
+            return nms(torch.from_numpy(dets), torch.from_numpy(scores), thresh).tolist()
+    
+    return _numpy_nms(dets, scores, thresh)
+
 
 class GradingEngine:
     """
@@ -19,14 +109,48 @@ class GradingEngine:
     Assigns grade: Excellent, Good, Fair, Poor
     """
     
-    def __init__(self, model_path: str = None):
+    def __init__(
+        self,
+        model_path: str = None,
+        conf_threshold: float = 0.25,
+        iou_threshold: float = 0.45
+    ):
         self.model_path = model_path
         self.model_version = "YOLOv10-v1.0"
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
         self.is_loaded = False
+        self.model = None
+        self.session = None
+        
+        # Returned as-is whenever there are no images to grade
+        self._default = FrozenDict({
+            'grade': 'good',
+            'confidence_score': 0.50,
+            'screen_scratches_count': 0,
+            'screen_cracks_count': 0,
+            'body_scratches_count': 0,
+            'body_dents_count': 0,
+            'damage_score': 0,
+            'detection_results': FrozenDict(),
+            'cv_model_version': self.model_version,
+            'image_urls': (),
+        })
+        
+        if model_path and model_path.endswith('.onnx'):
+            try:
+                self._load_onnx_session(model_path)
+                self.is_loaded = True
+            except Exception as e:
+                logger.warning(f"ONNX model unavailable, using mock detection: {e}")
+        elif model_path:
+            try:
+                from ultralytics import YOLO
+                self.model = YOLO(model_path)
+                self.is_loaded = True
+            except Exception as e:
+                logger.warning(f"YOLO model unavailable, using mock detection: {e}")
         
-        # Model would be loaded here in production
-        # from ultralytics import YOLO
-        # self.model = YOLO(model_path)
         logger.info("Grading Engine initialized")
     
     async def grade_device(
@@ -36,20 +160,37 @@ class GradingEngine:
         """
         Grade device condition from images.
         
+        Model inference runs in a worker thread so the event loop keeps
+        serving other requests while the model is busy. Mock detection and
+        the shared no-images default take microseconds and run inline,
+        without the thread hand-off.
+        
         Args:
             image_urls: List of image URLs (front, back, sides)
         
         Returns:
             Grading results with damage detection
         """
+        if not image_urls or (self.session is None and not self.is_loaded):
+            return self.grade_device_sync(image_urls)
+        
+        return await asyncio.to_thread(self.grade_device_sync, image_urls)
+    
+    def grade_device_sync(
+        self,
+        image_urls: List[str]
+    ) -> Dict[str, Any]:
+        """Blocking implementation of grade_device."""
         if not image_urls:
             return self._default_grading()
         
-        # In production, this would download images and run YOLO inference
-        # results = self.model.predict(images)
-        
-        # Mock detection based on heuristics
-        detection_results = self._mock_detection(image_urls)
+        if self.session is not None:
+            detection_results = self._onnx_detection(image_urls)
+        elif self.is_loaded:
+            detection_results = self._batched_detection(image_urls)
+        else:
+            # Mock detection based on heuristics
+            detection_results = self._mock_detection(image_urls)
         
         # Calculate grade
         grade_info = self._calculate_grade(detection_results)
@@ -61,102 +202,269 @@ class GradingEngine:
             'image_urls': image_urls,
         }
     
+    def warmup(self):
+        """
+        Run the inference path once on synthetic input.
+        
+        Pays one-time costs (ONNX Runtime graph optimization and TensorRT
+        engine build, CUDA context, lazy imports) before the first request.
+        """
+        if self.session is not None:
+            batch = self.input_batch or 1
+            self.session.run(None, {
+                self.input_name: np.zeros((batch, 3, self.image_size, self.image_size), dtype=self.input_dtype)
+            })
+        elif self.is_loaded:
+            self.model.predict(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+        else:
+            self._calculate_grade(self._mock_detection(['warmup']))
+    
+    def _batched_detection(self, image_urls: List[str]) -> Dict[str, Any]:
+        """
+        Run YOLO over all images in a single batched forward pass.
+        
+        Detections from every image are merged per damage category, in the
+        same shape as the mock output.
+        """
+        results = self.model.predict(image_urls, batch=len(image_urls), verbose=False)
+        
+        return self._merge_detections(
+            (result.names[int(cls)], x1, y1, x2, y2, conf)
+            for result in results
+            for (x1, y1, x2, y2), conf, cls in zip(
+                result.boxes.xyxy.tolist(),
+                np.round(result.boxes.conf.cpu().numpy(), 2).tolist(),
+                result.boxes.cls.tolist()
+            )
+        )
+    
+    def _load_onnx_session(self, model_path: str):
+        """
+        Create the ONNX Runtime session for an exported YOLO model.
+        
+        Export with `YOLO(...).export(format='onnx', half=True)`. The session
+        is created once and reused across requests.
+        """
+        import onnxruntime as ort
+        
+        available = set(ort.get_available_providers())
+        providers = []
+        for provider in _ONNX_PROVIDERS:
+            if provider not in available:
+                continue
+            if provider == 'TensorrtExecutionProvider':
+                providers.append((provider, {
+                    'trt_fp16_enable': True,
+                    'trt_engine_cache_enable': True,
+                    'trt_engine_cache_path': os.path.dirname(os.path.abspath(model_path)),
+                }))
+            else:
+                providers.append(provider)
+        
+        self.session = ort.InferenceSession(model_path, providers=providers)
+        
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = np.float16 if model_input.type == 'tensor(float16)' else np.float32
+        self.input_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        self.image_size = model_input.shape[2] if isinstance(model_input.shape[2], int) else 640
+        
+        # Ultralytics stores the class names in the model metadata
+        names = self.session.get_modelmeta().custom_metadata_map.get('names', '{}')
+        self.class_names = ast.literal_eval(names)
+        
+        logger.info(f"ONNX grading model loaded with providers {self.session.get_providers()}")
+    
+    def _onnx_detection(self, image_urls: List[str]) -> Dict[str, Any]:
+        """
+        Run the ONNX model over all images, batched when the model allows.
+        
+        Handles the YOLOv10 end-to-end output of shape (batch, detections, 6)
+        holding x1, y1, x2, y2, score and class in letterboxed pixels, and
+        raw (batch, 4 + classes, anchors) output that still needs NMS.
+        """
+        images, transforms = zip(*(self._letterbox(self._load_image(url)) for url in image_urls))
+        batch = np.stack(images).astype(self.input_dtype)
+        
+        if self.input_batch is None:
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            # Static batch size: run fixed-size chunks, zero-padding the last
+            # one, and drop the outputs of the padding images
+            size = self.input_batch
+            padded = np.zeros((-(-len(batch) // size) * size, *batch.shape[1:]), dtype=batch.dtype)
+            padded[:len(batch)] = batch
+            outputs = np.concatenate([
+                self.session.run(None, {self.input_name: padded[i:i + size]})[0]
+                for i in range(0, len(padded), size)
+            ])[:len(batch)]
+        
+        def boxes():
+            for predictions, (scale, pad_x, pad_y) in zip(outputs, transforms):
+                if predictions.shape[-1] != 6:
+                    predictions = self._decode_raw_predictions(predictions)
+                predictions = predictions[predictions[:, 4] >= self.conf_threshold].astype(np.float32)
+                # Undo the letterbox to get original image coordinates
+                predictions[:, [0, 2]] -= pad_x
+                predictions[:, [1, 3]] -= pad_y
+                predictions[:, :4] /= scale
+                predictions[:, 4] = np.round(predictions[:, 4], 2)
+                for x1, y1, x2, y2, conf, cls in predictions.tolist():
+                    yield self.class_names.get(int(cls)), x1, y1, x2, y2, conf
+        
+        return self._merge_detections(boxes())
+    
+    def _decode_raw_predictions(self, predictions: np.ndarray) -> np.ndarray:
+        """
+        Turn one image's raw (4 + classes, anchors) output into NMS'd
+        (detections, 6) rows of x1, y1, x2, y2, score and class.
+        """
+        predictions = predictions.T.astype(np.float32)
+        class_scores = predictions[:, 4:]
+        classes = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(classes)), classes]
+        
+        candidates = scores >= self.conf_threshold
+        predictions, scores, classes = predictions[candidates], scores[candidates], classes[candidates]
+        
+        # Centre/size to corners
+        boxes = np.empty((len(predictions), 4), dtype=np.float32)
+        half_width, half_height = predictions[:, 2] / 2, predictions[:, 3] / 2
+        boxes[:, 0] = predictions[:, 0] - half_width
+        boxes[:, 1] = predictions[:, 1] - half_height
+        boxes[:, 2] = predictions[:, 0] + half_width
+        boxes[:, 3] = predictions[:, 1] + half_height
+        
+        # Shift each class into its own region so one NMS pass never
+        # suppresses boxes across classes
+        offsets = (classes * (self.image_size + 1)).astype(np.float32)[:, None]
+        keep = _nms(boxes + offsets, scores, self.iou_threshold)
+        
+        return np.column_stack((boxes[keep], scores[keep], classes[keep]))
+    
+    def _load_image(self, url: str):
+        """Open an image from an http(s) URL or a local path as RGB."""
+        from PIL import Image
+        
+        if url.startswith(('http://', 'https://')):
+            import requests
+            response = requests.get(url, timeout=10)
+            response.raise_for_status()
+            return Image.open(io.BytesIO(response.content)).convert('RGB')
+        return Image.open(url).convert('RGB')
+    
+    def _letterbox(self, image) -> Tuple[np.ndarray, Tuple[float, float, float]]:
+        """
+        Resize keeping aspect ratio and pad to the model's square input.
+        
+        Returns:
+            CHW array scaled to 0-1, and (scale, pad_x, pad_y) to map boxes back
+        """
+        from PIL import Image
+        
+        size = self.image_size
+        scale = min(size / image.width, size / image.height)
+        width, height = round(image.width * scale), round(image.height * scale)
+        pad_x, pad_y = (size - width) / 2, (size - height) / 2
+        
+        canvas = Image.new('RGB', (size, size), (114, 114, 114))
+        canvas.paste(image.resize((width, height), Image.BILINEAR), (int(pad_x), int(pad_y)))
+        
+        array = np.asarray(canvas, dtype=np.float32).transpose(2, 0, 1) / 255.0
+        return array, (scale, int(pad_x), int(pad_y))
+    
+    def _merge_detections(
+        self, boxes: Iterable[Tuple[str, float, float, float, float, float]]
+    ) -> Dict[str, Any]:
+        """
+        Group (category, x1, y1, x2, y2, confidence) boxes per damage category.
+        
+        Confidences are expected already rounded to 2 decimals. Output has
+        the same shape as the mock detection; boxes of other classes are
+        ignored.
+        """
+        columns = {category: ([], [], [], [], []) for category in DAMAGE_CATEGORIES}
+        
+        for category, x1, y1, x2, y2, conf in boxes:
+            box_columns = columns.get(category)
+            if box_columns is None:
+                continue
+            xs, ys, widths, heights, confs = box_columns
+            xs.append(int(x1))
+            ys.append(int(y1))
+            widths.append(int(x2 - x1))
+            heights.append(int(y2 - y1))
+            confs.append(conf)
+        
+        return {
+            category: {
+                'count': len(xs),
+                'confidence': max(confs, default=0.0),
+                'bounding_boxes': {'x': xs, 'y': ys, 'width': widths, 'height': heights, 'confidence': confs}
+            }
+            for category, (xs, ys, widths, heights, confs) in columns.items()
+        }
+    
     def _mock_detection(self, image_urls: List[str]) -> Dict[str, Any]:
-        """Mock damage detection (for development/demo)."""
+        """
+        Mock damage detection (for development/demo).
+        
+        Every field is drawn for all categories in one vectorized RNG call
+        instead of one Python call per box and field. Each category's
+        bounding box columns are NumPy slices of those draws, serialized
+        natively by orjson.
+        """
+        rng = get_rng()
+        
         # Simulate realistic detection results
-        screen_scratches = random.randint(0, 5)
-        screen_cracks = random.randint(0, 2)
-        body_scratches = random.randint(0, 8)
-        body_dents = random.randint(0, 3)
-        
-        detections = {
-            'screen_scratches': {
-                'count': screen_scratches,
-                'confidence': round(random.uniform(0.85, 0.95), 2),
-                'bounding_boxes': [
-                    {
-                        'x': random.randint(100, 400),
-                        'y': random.randint(100, 600),
-                        'width': random.randint(20, 100),
-                        'height': random.randint(10, 50),
-                        'confidence': round(random.uniform(0.8, 0.95), 2)
-                    }
-                    for _ in range(screen_scratches)
-                ]
-            },
-            'screen_cracks': {
-                'count': screen_cracks,
-                'confidence': round(random.uniform(0.88, 0.96), 2),
-                'bounding_boxes': [
-                    {
-                        'x': random.randint(100, 400),
-                        'y': random.randint(100, 600),
-                        'width': random.randint(50, 200),
-                        'height': random.randint(5, 20),
-                        'confidence': round(random.uniform(0.85, 0.96), 2)
-                    }
-                    for _ in range(screen_cracks)
-                ]
-            },
-            'body_scratches': {
-                'count': body_scratches,
-                'confidence': round(random.uniform(0.82, 0.93), 2),
-                'bounding_boxes': [
-                    {
-                        'x': random.randint(50, 450),
-                        'y': random.randint(50, 650),
-                        'width': random.randint(10, 60),
-                        'height': random.randint(5, 30),
-                        'confidence': round(random.uniform(0.78, 0.92), 2)
-                    }
-                    for _ in range(body_scratches)
-                ]
-            },
-            'body_dents': {
-                'count': body_dents,
-                'confidence': round(random.uniform(0.80, 0.92), 2),
-                'bounding_boxes': [
-                    {
-                        'x': random.randint(50, 450),
-                        'y': random.randint(50, 650),
-                        'width': random.randint(15, 40),
-                        'height': random.randint(15, 40),
-                        'confidence': round(random.uniform(0.75, 0.90), 2)
-                    }
-                    for _ in range(body_dents)
-                ]
+        counts = rng.integers(0, _MOCK_MAX_COUNTS, endpoint=True)
+        confidences = np.round(
+            rng.uniform(_MOCK_CONFIDENCE_RANGES[:, 0], _MOCK_CONFIDENCE_RANGES[:, 1]), 2
+        ).tolist()
+        
+        # Per-box bounds: each category's row repeated once per box
+        boxes = rng.integers(
+            np.repeat(_MOCK_BOX_LOWS, counts, axis=0),
+            np.repeat(_MOCK_BOX_HIGHS, counts, axis=0),
+            endpoint=True
+        )
+        box_ranges = np.repeat(_MOCK_BOX_CONFIDENCE_RANGES, counts, axis=0)
+        box_confidences = np.round(rng.uniform(box_ranges[:, 0], box_ranges[:, 1]), 2)
+        
+        # One contiguous row per field, so every slice stays contiguous
+        xs, ys, widths, heights = np.ascontiguousarray(boxes.T)
+        
+        detections = {}
+        start = 0
+        for i, (category, count) in enumerate(zip(DAMAGE_CATEGORIES, counts.tolist())):
+            end = start + count
+            detections[category] = {
+                'count': count,
+                'confidence': confidences[i],
+                'bounding_boxes': {
+                    'x': xs[start:end],
+                    'y': ys[start:end],
+                    'width': widths[start:end],
+                    'height': heights[start:end],
+                    'confidence': box_confidences[start:end]
+                }
             }
-        }
+            start = end
         
         return detections
     
     def _calculate_grade(self, detection_results: Dict) -> Dict[str, Any]:
         """Calculate overall grade from detection results."""
-        screen_scratches = detection_results['screen_scratches']['count']
-        screen_cracks = detection_results['screen_cracks']['count']
-        body_scratches = detection_results['body_scratches']['count']
-        body_dents = detection_results['body_dents']['count']
+        counts = [detection_results[category]['count'] for category in DAMAGE_CATEGORIES]
+        screen_scratches, screen_cracks, body_scratches, body_dents = counts
         
         # Calculate damage score (0-100, lower is better)
-        damage_score = 0
-        damage_score += screen_scratches * 3  # Scratches less severe
-        damage_score += screen_cracks * 15    # Cracks very severe
-        damage_score += body_scratches * 2
-        damage_score += body_dents * 5
-        
-        # Determine grade
-        if damage_score == 0:
-            grade = "excellent"
-            confidence = 0.95
-        elif damage_score <= 10:
-            grade = "good"
-            confidence = 0.92
-        elif damage_score <= 30:
-            grade = "fair"
-            confidence = 0.89
-        else:
-            grade = "poor"
-            confidence = 0.87
+        damage_score = sum(map(operator.mul, _DAMAGE_WEIGHTS, counts))
+        
+        # Determine grade with a single threshold lookup
+        grade_index = bisect_right(_DAMAGE_THRESHOLDS, damage_score)
+        grade = _GRADES[grade_index]
+        confidence = _GRADE_CONFIDENCES[grade_index]
         
         return {
             'grade': grade,
@@ -170,19 +478,11 @@ class GradingEngine:
     
     def _default_grading(self) -> Dict[str, Any]:
         """Return default grading when no images provided."""
-        return {
-            'grade': 'good',
-            'confidence_score': 0.50,
-            'screen_scratches_count': 0,
-            'screen_cracks_count': 0,
-            'body_scratches_count': 0,
-            'body_dents_count': 0,
-            'damage_score': 0,
-            'detection_results': {},
-            'cv_model_version': self.model_version,
-            'image_urls': [],
-        }
+        return self._default
 
 
-# Singleton instance
-grading_engine = GradingEngine()
+# Singleton instance: the exported ONNX model when deployed, else the
+# Ultralytics checkpoint, else mock detection
+grading_engine = GradingEngine(
+    model_path=first_existing_path(settings.ONNX_GRADING_MODEL_PATH, settings.YOLO_MODEL_PATH)
+)
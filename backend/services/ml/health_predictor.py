@@ -1,12 +1,80 @@
 """Hardware health prediction using Temporal Fusion Transformer (TFT)."""
+import asyncio
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
 from datetime import datetime, timedelta
 import logging
 
+from services.ml._common import FrozenDict
+from services.ml.telemetry_columns import TelemetryColumns, columns_from_records, history_length
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 logger = logging.getLogger(__name__)
 
 
+def _predict_core(
+    current_health: float,
+    current_cycle: int,
+    avg_temp: float,
+    thermal_events: int,
+    crashes: int
+) -> Tuple[int, float, float]:
+    """
+    Heuristic RUL model on plain scalars.
+    
+    Compiled to native code with Numba when it is installed (fastmath stays
+    off so results match the interpreted version exactly). Threshold
+    adjustments are added or applied as 0/1 multiples rather than behind
+    branches; adding 0.0 leaves a value unchanged, so results are the same.
+    
+    Returns:
+        (rul_days, failure_probability, degradation_rate), unrounded
+    """
+    # Calculate degradation rate (% per day)
+    degradation_rate = 0.05  # Base rate
+    
+    # Adjust based on factors
+    degradation_rate += 0.02 * (current_cycle > 500)
+    degradation_rate += 0.03 * (current_cycle > 1000)
+    
+    degradation_rate += 0.01 * (avg_temp > 35)
+    degradation_rate += 0.02 * (avg_temp > 40)
+    
+    degradation_rate += thermal_events * 0.001
+    degradation_rate += crashes * 0.005
+    
+    # Calculate RUL
+    if current_health <= 20:
+        rul_days = int(current_health / degradation_rate) if degradation_rate > 0 else 30
+    else:
+        # Days until health reaches 20%
+        health_to_lose = current_health - 20
+        rul_days = int(health_to_lose / degradation_rate) if degradation_rate > 0 else 365
+    
+    # Cap RUL
+    rul_days = min(max(rul_days, 1), 730)  # Between 1 day and 2 years
+    
+    # Calculate failure probability
+    failure_prob = 1.0 - (current_health / 100.0)
+    failure_prob = min(max(failure_prob, 0.0), 1.0)
+    
+    # Adjust for extreme conditions
+    failure_prob = min(failure_prob + 0.1 * (thermal_events > 10), 1.0)
+    failure_prob = min(failure_prob + 0.15 * (crashes > 5), 1.0)
+    
+    return rul_days, failure_prob, degradation_rate
+
+
+if njit is not None:
+    _predict_core = njit(cache=True)(_predict_core)
+    # Compile now rather than on the first request
+    _predict_core(100.0, 0, 25.0, 0, 0)
+
+
 class HealthPredictor:
     """
     Hardware Health Predictor using TFT (Temporal Fusion Transformer).
@@ -22,24 +90,79 @@ class HealthPredictor:
         self.model_version = "TFT-v1.0"
         self.is_loaded = False
         
+        # Returned as-is whenever there is no telemetry to predict from
+        self._default = FrozenDict({
+            'predicted_rul_days': 365,
+            'failure_probability': 0.1,
+            'degradation_rate': 0.05,
+            'confidence_score': 0.50,  # Low confidence
+            'model_version': self.model_version,
+        })
+        
         # Model would be loaded here in production
         # self.model = torch.load(model_path)
         logger.info("Health Predictor initialized")
     
     async def predict_rul(
         self,
-        telemetry_history: List[Dict]
+        telemetry_history: Union[List[Dict], TelemetryColumns, np.ndarray]
     ) -> Dict[str, float]:
         """
         Predict Remaining Useful Life from telemetry data.
         
+        Inference runs in a worker thread so the event loop keeps serving
+        other requests during the forward pass. An empty history returns the
+        shared default prediction straight away.
+        
         Args:
-            telemetry_history: List of telemetry snapshots (last 30 days)
+            telemetry_history: Telemetry snapshots (last 30 days), as a list
+                of dicts, TelemetryColumns or a TELEMETRY_DTYPE record array
         
         Returns:
             Dictionary with predictions
         """
-        if not telemetry_history:
+        if isinstance(telemetry_history, dict):
+            is_empty = not history_length(telemetry_history)
+        else:
+            is_empty = not len(telemetry_history)
+        if is_empty:
+            return self._default_prediction()
+        
+        return await asyncio.to_thread(self.predict_rul_sync, telemetry_history)
+    
+    async def predict_rul_batch(
+        self,
+        telemetry_histories: List[Union[List[Dict], TelemetryColumns, np.ndarray]]
+    ) -> List[Dict[str, float]]:
+        """
+        Predict Remaining Useful Life for many devices in one inference call.
+        
+        Args:
+            telemetry_histories: Telemetry history per device
+        
+        Returns:
+            Predictions in the same order as the input histories
+        """
+        return await asyncio.to_thread(self.predict_rul_batch_sync, telemetry_histories)
+    
+    def predict_rul_batch_sync(
+        self,
+        telemetry_histories: List[Union[List[Dict], TelemetryColumns, np.ndarray]]
+    ) -> List[Dict[str, float]]:
+        """Blocking implementation of predict_rul_batch."""
+        # In production, stack the feature windows and run a single forward pass
+        # prediction = self.model.predict(np.stack(features))
+        return [self.predict_rul_sync(history) for history in telemetry_histories]
+    
+    def predict_rul_sync(
+        self,
+        telemetry_history: Union[List[Dict], TelemetryColumns, np.ndarray]
+    ) -> Dict[str, float]:
+        """Blocking implementation of predict_rul."""
+        if not isinstance(telemetry_history, (dict, np.ndarray)):
+            telemetry_history = columns_from_records(telemetry_history)
+        
+        if not history_length(telemetry_history):
             return self._default_prediction()
         
         # Extract features from telemetry
@@ -53,20 +176,34 @@ class HealthPredictor:
         
         return prediction
     
-    def _extract_features(self, telemetry_history: List[Dict]) -> Dict:
-        """Extract time-series features from telemetry data."""
-        # Sort by timestamp
-        sorted_history = sorted(
-            telemetry_history,
-            key=lambda x: x.get('timestamp', datetime.now())
-        )
+    def warmup(self):
+        """Run one prediction on synthetic telemetry before the first request."""
+        self.predict_rul_sync([{'timestamp': datetime.now(), 'battery_cycle_count': 100}])
+    
+    def _extract_features(self, telemetry_history: Union[TelemetryColumns, np.ndarray]) -> Dict:
+        """
+        Extract time-series features from non-empty telemetry columns.
+        
+        A TELEMETRY_DTYPE record array works too: selecting a field gives
+        the same column as from TelemetryColumns.
+        """
+        # Sort by timestamp (datetime64, i.e. integer keys). Histories read
+        # from the database are already in order, so check before paying for
+        # the argsort and the gathers.
+        timestamps = telemetry_history['timestamp']
+        if (timestamps[1:] < timestamps[:-1]).any():
+            order = np.argsort(timestamps, kind='stable')
+            if isinstance(telemetry_history, np.ndarray):
+                telemetry_history = telemetry_history[order]
+            else:
+                telemetry_history = {field: column[order] for field, column in telemetry_history.items()}
         
         # Extract time-varying features
-        battery_cycles = [t.get('battery_cycle_count', 0) for t in sorted_history]
-        battery_health = [t.get('battery_health_percentage', 100) for t in sorted_history]
-        temperatures = [t.get('battery_temperature', 25) for t in sorted_history]
-        thermal_events = [t.get('thermal_events_count', 0) for t in sorted_history]
-        crashes = [t.get('crash_count', 0) for t in sorted_history]
+        battery_cycles = telemetry_history['battery_cycle_count']
+        battery_health = telemetry_history['battery_health_percentage']
+        temperatures = telemetry_history['battery_temperature']
+        thermal_events = telemetry_history['thermal_events_count']
+        crashes = telemetry_history['crash_count']
         
         features = {
             'battery_cycles': battery_cycles,
@@ -74,60 +211,24 @@ class HealthPredictor:
             'temperatures': temperatures,
             'thermal_events': thermal_events,
             'crashes': crashes,
-            'current_cycle': battery_cycles[-1] if battery_cycles else 0,
-            'current_health': battery_health[-1] if battery_health else 100,
-            'avg_temperature': np.mean(temperatures) if temperatures else 25,
-            'total_thermal_events': sum(thermal_events),
-            'total_crashes': sum(crashes),
+            'current_cycle': int(battery_cycles[-1]),
+            'current_health': float(battery_health[-1]),
+            'avg_temperature': float(temperatures.mean()),
+            'total_thermal_events': int(thermal_events.sum()),
+            'total_crashes': int(crashes.sum()),
         }
         
         return features
     
     def _heuristic_prediction(self, features: Dict) -> Dict[str, float]:
         """Generate prediction using heuristic rules (fallback)."""
-        current_health = features.get('current_health', 100)
-        current_cycle = features.get('current_cycle', 0)
-        avg_temp = features.get('avg_temperature', 25)
-        thermal_events = features.get('total_thermal_events', 0)
-        crashes = features.get('total_crashes', 0)
-        
-        # Calculate degradation rate (% per day)
-        degradation_rate = 0.05  # Base rate
-        
-        # Adjust based on factors
-        if current_cycle > 500:
-            degradation_rate += 0.02
-        if current_cycle > 1000:
-            degradation_rate += 0.03
-        
-        if avg_temp > 35:
-            degradation_rate += 0.01
-        if avg_temp > 40:
-            degradation_rate += 0.02
-        
-        degradation_rate += thermal_events * 0.001
-        degradation_rate += crashes * 0.005
-        
-        # Calculate RUL
-        if current_health <= 20:
-            rul_days = int(current_health / degradation_rate) if degradation_rate > 0 else 30
-        else:
-            # Days until health reaches 20%
-            health_to_lose = current_health - 20
-            rul_days = int(health_to_lose / degradation_rate) if degradation_rate > 0 else 365
-        
-        # Cap RUL
-        rul_days = min(max(rul_days, 1), 730)  # Between 1 day and 2 years
-        
-        # Calculate failure probability
-        failure_prob = 1.0 - (current_health / 100.0)
-        failure_prob = min(max(failure_prob, 0.0), 1.0)
-        
-        # Adjust for extreme conditions
-        if thermal_events > 10:
-            failure_prob = min(failure_prob + 0.1, 1.0)
-        if crashes > 5:
-            failure_prob = min(failure_prob + 0.15, 1.0)
+        rul_days, failure_prob, degradation_rate = _predict_core(
+            float(features.get('current_health', 100)),
+            int(features.get('current_cycle', 0)),
+            float(features.get('avg_temperature', 25)),
+            int(features.get('total_thermal_events', 0)),
+            int(features.get('total_crashes', 0))
+        )
         
         return {
             'predicted_rul_days': rul_days,
@@ -139,13 +240,7 @@ class HealthPredictor:
     
     def _default_prediction(self) -> Dict[str, float]:
         """Return default prediction when no telemetry data available."""
-        return {
-            'predicted_rul_days': 365,
-            'failure_probability': 0.1,
-            'degradation_rate': 0.05,
-            'confidence_score': 0.50,  # Low confidence
-            'model_version': self.model_version,
-        }
+        return self._default
 
 
 # Singleton instance
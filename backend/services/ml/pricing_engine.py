@@ -1,10 +1,84 @@
 """Resale pricing engine using XGBoost."""
+import asyncio
+import itertools
 import logging
-from typing import Dict, Any
-import random
+from bisect import bisect_left
+from functools import lru_cache
+from math import prod
+from typing import Dict, Any, List
+import numpy as np
+
+from config.settings import settings
+from services.ml._common import FrozenDict, first_existing_path, get_rng
 
 logger = logging.getLogger(__name__)
 
+# Base prices by manufacturer (rows) and storage (columns). Unknown
+# manufacturers are priced as Samsung; unknown storage sizes fall into the
+# last column.
+_MANUFACTURER_INDEX = {'Apple': 0, 'Samsung': 1, 'Google': 2}
+_STORAGE_INDEX = {64: 0, 128: 1, 256: 2, 512: 3, 1024: 4}
+_BASE_PRICE_TABLE = np.array([
+    # 64   128  256  512  1024  other
+    [300, 400, 500, 650, 800, 300],  # Apple
+    [200, 280, 380, 500, 650, 300],  # Samsung
+    [180, 250, 350, 450, 600, 300],  # Google
+], dtype=np.float64)
+_DEFAULT_MANUFACTURER_INDEX = _MANUFACTURER_INDEX['Samsung']
+_OTHER_STORAGE_INDEX = len(_STORAGE_INDEX)
+
+# Grade factor by grade score (1=Poor .. 4=Excellent); index 0 holds the
+# factor for unknown scores
+_GRADE_FACTORS = np.array([0.7, 0.45, 0.65, 0.85, 1.0])
+
+# Battery factor multiplier by cycle count: up to 500, up to 1000, above
+_CYCLE_THRESHOLDS = (500, 1000)
+_CYCLE_FACTORS = (1.0, 0.9, 0.9 * 0.85)
+_CYCLE_FACTOR_ARRAY = np.array(_CYCLE_FACTORS)
+
+# Market price noise for single estimates, drawn up front and consumed
+# round-robin (size is a power of two so wrapping is a bit mask)
+_MARKET_NOISE_SIZE = 65536
+_MARKET_NOISE = get_rng().uniform(0.95, 1.10, size=_MARKET_NOISE_SIZE).tolist()
+_market_noise_index = itertools.count()
+
+# Input columns of the exported pricing model, in order
+_MODEL_FEATURES = (
+    'age_days',
+    'storage_gb',
+    'ram_gb',
+    'battery_health',
+    'battery_cycles',
+    'grade_score',
+    'screen_damage_score',
+    'body_damage_score',
+)
+
+# Feature importance (SHAP values simulation), shared by every estimate
+_FEATURE_IMPORTANCE = FrozenDict({
+    'age_days': 0.25,
+    'grade_score': 0.20,
+    'battery_health': 0.18,
+    'storage_gb': 0.15,
+    'screen_damage': 0.12,
+    'body_damage': 0.06,
+    'ram_gb': 0.04
+})
+
+
+def _market_noise() -> float:
+    """Next market price noise factor from the precomputed ring."""
+    return _MARKET_NOISE[next(_market_noise_index) & (_MARKET_NOISE_SIZE - 1)]
+
+
+@lru_cache(maxsize=256)
+def _base_price(manufacturer: str, storage_gb: int) -> float:
+    """Base price for a manufacturer/storage combination, memoized."""
+    return float(_BASE_PRICE_TABLE[
+        _MANUFACTURER_INDEX.get(manufacturer, _DEFAULT_MANUFACTURER_INDEX),
+        _STORAGE_INDEX.get(storage_gb, _OTHER_STORAGE_INDEX)
+    ])
+
 
 class PricingEngine:
     """
@@ -21,14 +95,52 @@ class PricingEngine:
         self.model_path = model_path
         self.model_version = "XGBoost-v1.0"
         self.is_loaded = False
+        self.session = None
+        
+        if model_path and model_path.endswith('.onnx'):
+            try:
+                self._load_onnx_session(model_path)
+                self.is_loaded = True
+            except Exception as e:
+                logger.warning(f"ONNX pricing model unavailable, using heuristic pricing: {e}")
         
-        # Model would be loaded here in production
-        # import xgboost as xgb
-        # self.model = xgb.Booster()
-        # self.model.load_model(model_path)
         logger.info("Pricing Engine initialized")
     
-    async def estimate_price(
+    def _load_onnx_session(self, model_path: str):
+        """
+        Create the ONNX Runtime session for the exported XGBoost model.
+        
+        Export the booster with onnxmltools.convert_xgboost, taking a float32
+        input of shape (None, len(_MODEL_FEATURES)).
+        """
+        import onnxruntime as ort
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        self.input_name = self.session.get_inputs()[0].name
+    
+    def _onnx_pricing(self, features: np.ndarray) -> np.ndarray:
+        """Predict prices for an (N, len(_MODEL_FEATURES)) float32 matrix."""
+        prices = self.session.run(None, {self.input_name: features})[0]
+        return np.asarray(prices, dtype=np.float64).reshape(-1)
+    
+    async def estimate_price(self, **features) -> Dict[str, Any]:
+        """
+        Estimate device resale price.
+        
+        Scoring takes microseconds, so it runs inline rather than paying for
+        a worker thread hand-off. Takes the keyword arguments of
+        estimate_price_sync.
+        """
+        return self.estimate_price_sync(**features)
+    
+    def estimate_price_sync(
         self,
         device_model: str,
         manufacturer: str,
@@ -61,9 +173,18 @@ class PricingEngine:
         Returns:
             Price estimate with confidence intervals
         """
-        # In production, this would use the actual XGBoost model
-        # features = self._prepare_features(...)
-        # prediction = self.model.predict(features)
+        if self.session is not None:
+            estimated_price = float(self._onnx_pricing(np.array([[
+                age_days,
+                storage_gb,
+                ram_gb,
+                battery_health,
+                battery_cycles,
+                grade_score,
+                screen_damage_score,
+                body_damage_score
+            ]], dtype=np.float32))[0])
+            return self._price_estimate(estimated_price, estimated_price * _market_noise())
         
         # Mock prediction based on heuristics
         price_estimate = self._heuristic_pricing(
@@ -82,6 +203,136 @@ class PricingEngine:
         
         return price_estimate
     
+    async def estimate_price_batch(
+        self,
+        devices: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Estimate resale prices for many devices.
+        
+        Runs in a worker thread so large batches don't block the event loop.
+        
+        Args:
+            devices: Keyword arguments of estimate_price, one dict per device
+        
+        Returns:
+            Price estimates in the same order as the input
+        """
+        return await asyncio.to_thread(self.estimate_price_batch_sync, devices)
+    
+    def estimate_price_batch_sync(
+        self,
+        devices: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Blocking implementation of estimate_price_batch.
+        
+        Features are packed into one array per field and priced with
+        element-wise array operations in a single pass.
+        
+        Args:
+            devices: Keyword arguments of estimate_price, one dict per device
+        
+        Returns:
+            Price estimates in the same order as the input
+        """
+        n = len(devices)
+        
+        def column(values, dtype):
+            return np.fromiter(values, dtype=dtype, count=n)
+        
+        if self.session is not None:
+            # One feature matrix, one model call
+            features = np.empty((n, len(_MODEL_FEATURES)), dtype=np.float32)
+            for j, name in enumerate(_MODEL_FEATURES):
+                features[:, j] = column((d[name] for d in devices), np.float32)
+            estimated_prices = self._onnx_pricing(features)
+        else:
+            estimated_prices = self._heuristic_pricing_batch(
+                manufacturer_idx=column(
+                    (_MANUFACTURER_INDEX.get(d['manufacturer'], _DEFAULT_MANUFACTURER_INDEX) for d in devices),
+                    np.intp
+                ),
+                storage_idx=column(
+                    (_STORAGE_INDEX.get(d['storage_gb'], _OTHER_STORAGE_INDEX) for d in devices),
+                    np.intp
+                ),
+                age_days=column((d['age_days'] for d in devices), np.float64),
+                battery_health=column((d['battery_health'] for d in devices), np.float64),
+                battery_cycles=column((d['battery_cycles'] for d in devices), np.int64),
+                grade_score=column((d['grade_score'] for d in devices), np.int64),
+                screen_damage=column((d['screen_damage_score'] for d in devices), np.float64),
+                body_damage=column((d['body_damage_score'] for d in devices), np.float64),
+                original_price=column((d.get('original_price') or 0 for d in devices), np.float64)
+            )
+        
+        # Market average (add some variance)
+        market_averages = estimated_prices * get_rng().uniform(0.95, 1.10, size=n)
+        
+        return [
+            self._price_estimate(estimated_price, market_average)
+            for estimated_price, market_average in zip(
+                estimated_prices.tolist(), market_averages.tolist()
+            )
+        ]
+    
+    def warmup(self):
+        """Price a synthetic device, single and batched, before the first request."""
+        device = {
+            'device_model': 'warmup',
+            'manufacturer': 'Apple',
+            'age_days': 365,
+            'storage_gb': 128,
+            'ram_gb': 8,
+            'battery_health': 95.0,
+            'battery_cycles': 100,
+            'grade_score': 4,
+            'screen_damage_score': 1,
+            'body_damage_score': 1,
+            'original_price': 1000.0,
+        }
+        self.estimate_price_sync(**device)
+        self.estimate_price_batch_sync([device])
+    
+    def _heuristic_pricing_batch(
+        self,
+        manufacturer_idx: np.ndarray,
+        storage_idx: np.ndarray,
+        age_days: np.ndarray,
+        battery_health: np.ndarray,
+        battery_cycles: np.ndarray,
+        grade_score: np.ndarray,
+        screen_damage: np.ndarray,
+        body_damage: np.ndarray,
+        original_price: np.ndarray
+    ) -> np.ndarray:
+        """
+        Array form of _heuristic_pricing's estimated price.
+        
+        Applies the same factors in the same order, so each element equals
+        the scalar result. original_price is 0 where unknown.
+        """
+        base_price = np.where(
+            original_price != 0,
+            original_price * 0.6,
+            _BASE_PRICE_TABLE[manufacturer_idx, storage_idx]
+        )
+        
+        age_factor = np.maximum(0.3, 1.0 - ((age_days / 365) * 0.20))
+        
+        battery_factor = battery_health / 100
+        battery_factor *= _CYCLE_FACTOR_ARRAY[np.searchsorted(_CYCLE_THRESHOLDS, battery_cycles)]
+        
+        grade_factor = _GRADE_FACTORS[np.where((grade_score >= 1) & (grade_score <= 4), grade_score, 0)]
+        
+        # Multiply the factors into one buffer, left to right
+        estimated_prices = base_price * age_factor
+        estimated_prices *= battery_factor
+        estimated_prices *= grade_factor
+        estimated_prices *= 1.0 - (screen_damage * 0.05)
+        estimated_prices *= 1.0 - (body_damage * 0.03)
+        return estimated_prices
+    
     def _heuristic_pricing(
         self,
         device_model: str,
@@ -97,22 +348,8 @@ class PricingEngine:
         original_price: float = None
     ) -> Dict[str, Any]:
         """Calculate price using heuristic rules."""
-        # Base prices by manufacturer and storage
-        base_prices = {
-            'Apple': {
-                64: 300, 128: 400, 256: 500, 512: 650, 1024: 800
-            },
-            'Samsung': {
-                64: 200, 128: 280, 256: 380, 512: 500, 1024: 650
-            },
-            'Google': {
-                64: 180, 128: 250, 256: 350, 512: 450, 1024: 600
-            }
-        }
-        
         # Get base price
-        manufacturer_prices = base_prices.get(manufacturer, base_prices['Samsung'])
-        base_price = manufacturer_prices.get(storage_gb, 300)
+        base_price = _base_price(manufacturer, storage_gb)
         
         # Use original price if provided
         if original_price:
@@ -123,62 +360,46 @@ class PricingEngine:
         age_factor = max(0.3, 1.0 - (age_years * 0.20))
         
         # Battery health factor
-        battery_factor = battery_health / 100
-        if battery_cycles > 500:
-            battery_factor *= 0.9
-        if battery_cycles > 1000:
-            battery_factor *= 0.85
+        battery_factor = battery_health / 100 * _CYCLE_FACTORS[bisect_left(_CYCLE_THRESHOLDS, battery_cycles)]
         
         # Grade factor
-        grade_factors = {
-            4: 1.0,   # Excellent
-            3: 0.85,  # Good
-            2: 0.65,  # Fair
-            1: 0.45   # Poor
-        }
-        grade_factor = grade_factors.get(grade_score, 0.7)
+        grade_factor = float(_GRADE_FACTORS[grade_score if 1 <= grade_score <= 4 else 0])
         
         # Damage penalties
         screen_penalty = 1.0 - (screen_damage_score * 0.05)
         body_penalty = 1.0 - (body_damage_score * 0.03)
         
         # Calculate estimated price
-        estimated_price = (
-            base_price * 
-            age_factor * 
-            battery_factor * 
-            grade_factor * 
-            screen_penalty * 
+        estimated_price = prod((
+            base_price,
+            age_factor,
+            battery_factor,
+            grade_factor,
+            screen_penalty,
             body_penalty
-        )
+        ))
         
         # Market average (add some variance)
-        market_average = estimated_price * random.uniform(0.95, 1.10)
+        market_average = estimated_price * _market_noise()
         
+        return self._price_estimate(estimated_price, market_average)
+    
+    def _price_estimate(self, estimated_price: float, market_average: float) -> Dict[str, Any]:
+        """Build the price estimate returned for one device."""
         # Confidence intervals (±15%)
         confidence_range = estimated_price * 0.15
         
-        # Feature importance (SHAP values simulation)
-        feature_importance = {
-            'age_days': 0.25,
-            'grade_score': 0.20,
-            'battery_health': 0.18,
-            'storage_gb': 0.15,
-            'screen_damage': 0.12,
-            'body_damage': 0.06,
-            'ram_gb': 0.04
-        }
-        
         return {
             'estimated_resale_price': round(estimated_price, 2),
             'market_average_price': round(market_average, 2),
             'confidence_interval_lower': round(estimated_price - confidence_range, 2),
             'confidence_interval_upper': round(estimated_price + confidence_range, 2),
             'model_version': self.model_version,
-            'feature_importance': feature_importance,
+            'feature_importance': _FEATURE_IMPORTANCE,
             'r_squared': 0.85,  # Model performance metric
         }
 
 
-# Singleton instance
-pricing_engine = PricingEngine()
+# Singleton instance: the exported ONNX model when deployed, else heuristic
+# pricing
+pricing_engine = PricingEngine(model_path=first_existing_path(settings.ONNX_PRICING_MODEL_PATH))
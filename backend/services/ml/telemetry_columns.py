@@ -0,0 +1,79 @@
+"""Column-oriented (SoA) telemetry history used as ML engine input."""
+from datetime import datetime
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+# Field -> (dtype, value used when a reading is missing). Floats stay at
+# double precision to match the database columns.
+TELEMETRY_FIELDS = {
+    'timestamp': ('datetime64[us]', None),
+    'battery_cycle_count': (np.int32, 0),
+    'battery_health_percentage': (np.float64, 100),
+    'battery_temperature': (np.float64, 25),
+    'thermal_events_count': (np.int32, 0),
+    'crash_count': (np.int32, 0),
+}
+
+# One contiguous 1-D array per field, all of equal length
+TelemetryColumns = Dict[str, np.ndarray]
+
+# Structured (record) layout of the same fields, for short windows that are
+# built and appended to point by point
+TELEMETRY_DTYPE = np.dtype([(field, dtype) for field, (dtype, _) in TELEMETRY_FIELDS.items()])
+
+
+def columns_from_rows(rows: Sequence[Sequence]) -> TelemetryColumns:
+    """
+    Build columns from row tuples in TELEMETRY_FIELDS order.
+
+    Rows must not contain missing values.
+    """
+    values = zip(*rows) if rows else [()] * len(TELEMETRY_FIELDS)
+    return {
+        field: np.array(column, dtype=dtype)
+        for (field, (dtype, _)), column in zip(TELEMETRY_FIELDS.items(), values)
+    }
+
+
+def columns_from_records(records: List[Dict]) -> TelemetryColumns:
+    """
+    Build columns from telemetry dicts, filling in missing fields.
+
+    Each column is filled straight into a preallocated buffer with
+    np.fromiter, without an intermediate list per field.
+    """
+    now = datetime.now()
+    n = len(records)
+    return {
+        field: np.fromiter(
+            (record.get(field, now if fill is None else fill) for record in records),
+            dtype=dtype,
+            count=n
+        )
+        for field, (dtype, fill) in TELEMETRY_FIELDS.items()
+    }
+
+
+def concat_columns(chunks: Iterable[TelemetryColumns]) -> TelemetryColumns:
+    """Join column chunks (e.g. cursor partitions) end to end."""
+    chunks = list(chunks)
+    if not chunks:
+        return columns_from_rows([])
+    if len(chunks) == 1:
+        return chunks[0]
+    return {field: np.concatenate([chunk[field] for chunk in chunks]) for field in TELEMETRY_FIELDS}
+
+
+def records_from_rows(rows: Sequence[Sequence]) -> np.ndarray:
+    """
+    Build a TELEMETRY_DTYPE array from row tuples in TELEMETRY_FIELDS order.
+
+    Fields are selected from it like TelemetryColumns (records['crash_count']).
+    """
+    return np.array([tuple(row) for row in rows], dtype=TELEMETRY_DTYPE)
+
+
+def history_length(columns: TelemetryColumns) -> int:
+    """Number of snapshots held in the columns (or record array)."""
+    return len(columns['timestamp'])
@@ -0,0 +1,74 @@
+"""In-process cache of each device's most recent telemetry window."""
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from config.settings import settings
+
+
+class TelemetryWindowCache:
+    """
+    LRU cache of the last N telemetry points per device.
+
+    Rapid-fire ingest from the same device reuses the cached window instead
+    of re-reading the latest snapshots on every request. A window expires
+    TTL seconds after it was loaded from the database (appends do not extend
+    it), so points written by other workers are picked up on the next reload.
+
+    Windows are TELEMETRY_DTYPE record arrays and are replaced, never
+    modified in place, so a returned window stays valid.
+    """
+
+    def __init__(self, window_size: int = 30, ttl_seconds: int = 30, max_devices: int = 10000):
+        self.window_size = window_size
+        self.ttl_seconds = ttl_seconds
+        self.max_devices = max_devices
+        self._windows: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, device_id: str) -> Optional[np.ndarray]:
+        """Return the cached window in chronological order, or None."""
+        entry = self._windows.get(device_id)
+        if entry is None:
+            return None
+
+        expires_at, window = entry
+        if expires_at < time.monotonic():
+            del self._windows[device_id]
+            return None
+
+        self._windows.move_to_end(device_id)
+        return window
+
+    def load(self, device_id: str, history: np.ndarray):
+        """Store a freshly queried window (chronological order)."""
+        self._windows[device_id] = (
+            time.monotonic() + self.ttl_seconds,
+            history[-self.window_size:]
+        )
+        self._windows.move_to_end(device_id)
+
+        while len(self._windows) > self.max_devices:
+            self._windows.popitem(last=False)
+
+    def discard(self, device_id: str):
+        """Drop a device's window, e.g. when the device is deleted."""
+        self._windows.pop(device_id, None)
+
+    def append(self, device_id: str, point: np.ndarray):
+        """Append new point(s) to a cached window, if one exists."""
+        entry = self._windows.get(device_id)
+        if entry is not None:
+            expires_at, window = entry
+            self._windows[device_id] = (
+                expires_at,
+                np.concatenate((window, point))[-self.window_size:]
+            )
+
+
+# Singleton instance
+telemetry_window_cache = TelemetryWindowCache(
+    window_size=settings.TELEMETRY_WINDOW_SIZE,
+    ttl_seconds=settings.TELEMETRY_WINDOW_TTL_SECONDS
+)
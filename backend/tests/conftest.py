@@ -0,0 +1,48 @@
+"""Shared test fixtures."""
+import sys
+import types
+
+import numpy as np
+import pytest
+
+
+class FakeInferenceSession:
+    """
+    Stands in for onnxruntime.InferenceSession.
+    
+    Reports a single static-shape float input and returns one row of
+    zeros per input row.
+    """
+
+    input_name = 'input'
+    input_shape = [1, 3, 640, 640]
+    output_shape = (300, 6)
+
+    def __init__(self, model_path, sess_options=None, providers=None):
+        self.model_path = model_path
+        self.providers = providers or ['CPUExecutionProvider']
+
+    def get_inputs(self):
+        return [types.SimpleNamespace(name=self.input_name, type='tensor(float)', shape=self.input_shape)]
+
+    def get_modelmeta(self):
+        return types.SimpleNamespace(custom_metadata_map={'names': "{0: 'screen_scratches'}"})
+
+    def get_providers(self):
+        return self.providers
+
+    def run(self, output_names, feeds):
+        rows = len(feeds[self.input_name])
+        return [np.zeros((rows, *self.output_shape), dtype=np.float32)]
+
+
+@pytest.fixture
+def fake_onnxruntime(monkeypatch):
+    """Install a stub onnxruntime module whose sessions are FakeInferenceSession."""
+    module = types.ModuleType('onnxruntime')
+    module.get_available_providers = lambda: ['CPUExecutionProvider']
+    module.SessionOptions = types.SimpleNamespace
+    module.GraphOptimizationLevel = types.SimpleNamespace(ORT_ENABLE_ALL='all')
+    module.InferenceSession = FakeInferenceSession
+    monkeypatch.setitem(sys.modules, 'onnxruntime', module)
+    return module
@@ -0,0 +1,17 @@
+"""Grading engine backend selection."""
+from services.ml._common import first_existing_path
+from services.ml.grading_engine import GradingEngine
+
+
+def test_onnx_artifact_preferred_over_yolo(tmp_path, fake_onnxruntime):
+    onnx_path = tmp_path / 'grading.onnx'
+    yolo_path = tmp_path / 'grading.pt'
+    onnx_path.write_bytes(b'')
+    yolo_path.write_bytes(b'')
+
+    model_path = first_existing_path(str(tmp_path / 'missing.onnx'), str(onnx_path), str(yolo_path))
+    engine = GradingEngine(model_path=model_path)
+
+    assert engine.model_path == str(onnx_path)
+    assert isinstance(engine.session, fake_onnxruntime.InferenceSession)
+    assert engine.is_loaded
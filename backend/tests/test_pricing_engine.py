@@ -0,0 +1,33 @@
+"""Pricing engine backend selection."""
+import numpy as np
+
+from services.ml._common import first_existing_path
+from services.ml.pricing_engine import PricingEngine
+
+
+def test_configured_onnx_model_prices_through_session(tmp_path, fake_onnxruntime, monkeypatch):
+    onnx_path = tmp_path / 'pricing.onnx'
+    onnx_path.write_bytes(b'')
+    monkeypatch.setattr(
+        fake_onnxruntime.InferenceSession, 'run',
+        lambda self, output_names, feeds: [np.full((len(feeds['input']), 1), 100.0, dtype=np.float32)]
+    )
+
+    engine = PricingEngine(model_path=first_existing_path(str(onnx_path)))
+
+    assert engine.model_path == str(onnx_path)
+    assert isinstance(engine.session, fake_onnxruntime.InferenceSession)
+
+    estimate = engine.estimate_price_sync(
+        device_model='test',
+        manufacturer='Apple',
+        age_days=365,
+        storage_gb=128,
+        ram_gb=8,
+        battery_health=95.0,
+        battery_cycles=100,
+        grade_score=4,
+        screen_damage_score=1,
+        body_damage_score=1
+    )
+    assert estimate['estimated_resale_price'] == 100.0